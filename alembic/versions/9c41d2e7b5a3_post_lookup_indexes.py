@@ -0,0 +1,41 @@
+"""post lookup indexes
+
+Revision ID: 9c41d2e7b5a3
+Revises: 5a6fa3941189
+Create Date: 2026-10-18 10:12:41.512904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c41d2e7b5a3'
+down_revision: Union[str, Sequence[str], None] = '5a6fa3941189'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The unique key cannot be added while a request still holds the same lot twice; keep the oldest row
+    op.execute(sa.text(
+        'DELETE FROM post WHERE id NOT IN ('
+        'SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM post GROUP BY request_id, lot_id) AS kept)'
+    ))
+
+    op.create_index(op.f('ix_post_lot_id'), 'post', ['lot_id'], unique=False)
+    # Leads with request_id, so it also serves the request_id lookups
+    with op.batch_alter_table('post') as batch_op:
+        batch_op.create_unique_constraint('uq_post_request_id_lot_id', ['request_id', 'lot_id'])
+    op.create_index(op.f('ix_request_filters_user_uuid'), 'request_filters', ['user_uuid'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_request_filters_user_uuid'), table_name='request_filters')
+    with op.batch_alter_table('post') as batch_op:
+        batch_op.drop_constraint('uq_post_request_id_lot_id', type_='unique')
+    op.drop_index(op.f('ix_post_lot_id'), table_name='post')
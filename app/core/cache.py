@@ -0,0 +1,101 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+from app.core.metrics import metrics
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+_MISSING: Any = object()
+
+
+class AsyncTTLCache(Generic[K, V]):
+    """
+    In-process LRU cache with per-entry TTL and single-flight loading.
+
+    Concurrent ``get_or_load`` calls for the same missing key share one loader
+    call. The loader runs in its own task, so a cancelled caller does not cancel
+    the load for the others. Exceptions are not cached.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._inflight: dict[K, asyncio.Future] = {}
+        self._loads: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            metrics.inc('cache.evictions', cache=self.name)
+
+    def invalidate(self, key: K):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    async def get_or_load(self, key: K, loader: Callable[[], Awaitable[V]]) -> V:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            metrics.inc('cache.hits', cache=self.name)
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            metrics.inc('cache.coalesced', cache=self.name)
+            return await asyncio.shield(future)
+
+        metrics.inc('cache.misses', cache=self.name)
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be left waiting when the load fails; mark the exception as retrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        task = asyncio.create_task(self._load(key, loader, future))
+        self._loads.add(task)
+        task.add_done_callback(self._loads.discard)
+        return await asyncio.shield(future)
+
+    async def _load(self, key: K, loader: Callable[[], Awaitable[V]], future: asyncio.Future):
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            metrics.inc('cache.load_errors', cache=self.name)
+            future.set_exception(e)
+        else:
+            self.set(key, value)
+            future.set_result(value)
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            'size': len(self._data),
+            'hits': metrics.get('cache.hits', cache=self.name),
+            'misses': metrics.get('cache.misses', cache=self.name),
+            'coalesced': metrics.get('cache.coalesced', cache=self.name),
+            'evictions': metrics.get('cache.evictions', cache=self.name),
+        }
@@ -0,0 +1,52 @@
+import asyncio
+from collections import defaultdict
+from typing import Any
+
+from app.core.logger import logger
+
+
+class Metrics:
+    """
+    In-process counters and gauges.
+
+    The service has no metrics backend, so values are kept in memory and
+    periodically written to the structured log (see ``report_periodically``).
+    """
+
+    def __init__(self):
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict[str, Any]) -> str:
+        if not labels:
+            return name
+        rendered = ','.join(f'{key}={value}' for key, value in sorted(labels.items()))
+        return f'{name}{{{rendered}}}'
+
+    def inc(self, name: str, value: float = 1, **labels: Any):
+        self._counters[self._key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels: Any):
+        self._gauges[self._key(name, labels)] = value
+
+    def add_gauge(self, name: str, delta: float, **labels: Any):
+        key = self._key(name, labels)
+        self._gauges[key] = self._gauges.get(key, 0) + delta
+
+    def get(self, name: str, **labels: Any) -> float:
+        key = self._key(name, labels)
+        if key in self._gauges:
+            return self._gauges[key]
+        return self._counters.get(key, 0)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {'counters': dict(self._counters), 'gauges': dict(self._gauges)}
+
+    async def report_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            logger.info("Metrics snapshot", extra={"metrics": self.snapshot()})
+
+
+metrics = Metrics()
@@ -1,9 +1,12 @@
 from typing import TypeVar, Generic, Type, Optional, Sequence
 
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
 from sqlalchemy.future import select
 from pydantic import BaseModel
 
+from app.database.db.session import in_unit_of_work
+
 ModelType = TypeVar("ModelType")
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
@@ -14,8 +17,16 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self.model = model
         self.session = session
 
-    async def get(self, obj_id: int) -> Optional[ModelType]:
-        return await self.session.get(self.model, obj_id)
+    async def _commit(self):
+        # Inside a unit of work the owner decides when to commit
+        if in_unit_of_work(self.session):
+            await self.session.flush()
+        else:
+            await self.session.commit()
+
+    async def get(self, obj_id: int, options: Sequence[ExecutableOption] = ()) -> Optional[ModelType]:
+        # Relationships are lazy="raise"; pass loader options for the ones the caller reads
+        return await self.session.get(self.model, obj_id, options=options)
 
     async def get_all(self) -> Sequence[ModelType]:
         result = await self.session.execute(select(self.model))
@@ -27,7 +38,7 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if flush:
             await self.session.flush()
             return obj
-        await self.session.commit()
+        await self._commit()
         await self.session.refresh(obj)
         return obj
 
@@ -37,7 +48,7 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             return None
         for key, value in data.model_dump(exclude_unset=True).items():
             setattr(obj, key, value)
-        await self.session.commit()
+        await self._commit()
         await self.session.refresh(obj)
         return obj
 
@@ -46,5 +57,5 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if not obj:
             return False
         await self.session.delete(obj)
-        await self.session.commit()
+        await self._commit()
         return True
@@ -0,0 +1,63 @@
+import uuid
+from datetime import datetime, UTC
+from typing import Any, Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.crud.base import BaseService
+from app.database.models.outbox import OutboxMessage
+
+OUTBOX_PENDING_KEY = 'outbox_pending'
+
+
+class OutboxService(BaseService[OutboxMessage, Any, Any]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(OutboxMessage, session)
+
+    async def enqueue(self, routing_key: str, payload: dict[str, Any]) -> OutboxMessage:
+        """Stores a message to be published once the surrounding transaction commits."""
+        message = OutboxMessage(
+            message_id=str(uuid.uuid4()),
+            routing_key=routing_key,
+            payload=payload,
+            attempts=0,
+            created_at=datetime.now(UTC)
+        )
+        self.session.add(message)
+        # Tells the relay to wake up after the commit (see outbox_relay)
+        self.session.info[OUTBOX_PENDING_KEY] = True
+        await self._commit()
+        return message
+
+    async def claim_unpublished(self, limit: int, max_attempts: int) -> Sequence[OutboxMessage]:
+        stmt = (
+            select(OutboxMessage)
+            .where(OutboxMessage.published_at.is_(None), OutboxMessage.attempts < max_attempts)
+            .order_by(OutboxMessage.id)
+            .limit(limit)
+            # Lets several relays share the table on PostgreSQL; ignored by SQLite
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def mark_published(self, ids: list[int]):
+        if not ids:
+            return
+        await self.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(ids))
+            .values(published_at=datetime.now(UTC))
+            .execution_options(synchronize_session=False)
+        )
+
+    async def mark_failed(self, ids: list[int]):
+        if not ids:
+            return
+        await self.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(ids))
+            .values(attempts=OutboxMessage.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
@@ -1,27 +1,70 @@
+from datetime import datetime, UTC
 from typing import Any, Coroutine, Sequence, Union
 
-from sqlalchemy import select, Row, RowMapping
+from sqlalchemy import delete, select, update, bindparam, Row, RowMapping
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.crud.base import BaseService
 from app.database.models.post import Post
+from app.database.seen_lots import seen_lot_index
 from app.database.schemas.post import PostCreate, PostUpdate
 
 
 class PostService(BaseService[Post, PostCreate, PostUpdate]):
+    # Keeps a multi-row INSERT well under the bind parameter limits of asyncpg and SQLite
+    bulk_insert_chunk_size: int = 500
+
     def __init__(self, session: AsyncSession):
         super().__init__(Post, session)
 
-    async def get_repeated_posts(self, lot_ids: list[int], return_ids: bool = False) -> Union[
-        Sequence[Post], list[int]]:
-        result = await self.session.execute(
-            select(Post if not return_ids else Post.lot_id).where(
-                Post.lot_id.in_(lot_ids)
-            )
+    def _dialect_insert(self):
+        if self.session.bind.dialect.name == 'postgresql':
+            return postgresql.insert
+        return sqlite.insert
+
+    async def bulk_create(self, rows: list[dict[str, Any]], commit: bool = True) -> list[Post]:
+        """
+        Inserts posts with one multi-row INSERT ... RETURNING per chunk.
+
+        Rows hitting a unique constraint are skipped, so the result only holds the inserted posts.
+        """
+        if not rows:
+            return []
+
+        insert = self._dialect_insert()
+        created = []
+        for start in range(0, len(rows), self.bulk_insert_chunk_size):
+            chunk = rows[start:start + self.bulk_insert_chunk_size]
+            stmt = insert(Post).values(chunk).on_conflict_do_nothing().returning(Post)
+            result = await self.session.scalars(stmt)
+            created.extend(result.all())
+
+        if created:
+            seen_lot_index.add(post.lot_id for post in created)
+
+        if commit:
+            await self._commit()
+        return created
+
+    async def get_repeated_posts(self, lot_ids: list[int], return_ids: bool = False,
+                                 after_post_id: int | None = None) -> Union[Sequence[Post], list[int]]:
+        stmt = select(Post if not return_ids else Post.lot_id).where(
+            Post.lot_id.in_(lot_ids)
         )
+        if after_post_id is not None:
+            stmt = stmt.where(Post.id > after_post_id)
+        result = await self.session.execute(stmt)
         return result.scalars().all()
 
 
+    async def get_repeated_lot_ids(self, lot_ids: list[int]) -> set[int]:
+        return await seen_lot_index.repeated_lot_ids(
+            lot_ids,
+            lambda candidates, after_post_id: self.get_repeated_posts(candidates, return_ids=True,
+                                                                      after_post_id=after_post_id)
+        )
+
     async def get_by_lot_id(self, lot_id: int) -> Post:
         result = await self.session.execute(
             select(Post).where(
@@ -31,19 +74,22 @@ class PostService(BaseService[Post, PostCreate, PostUpdate]):
         return result.scalars().first()
 
     async def left_only_this_lot_ids(self, request_filter_id: int, lot_ids: list[int]) -> list[Post]:
-        stmt = select(Post).where(Post.request_id == request_filter_id)
-        result = await self.session.execute(stmt)
-        posts = result.scalars().all()
-
-        posts_to_delete = [post for post in posts if post.lot_id not in lot_ids]
-        posts_to_keep = [post for post in posts if post.lot_id in lot_ids]
-
-        for post in posts_to_delete:
-            await self.session.delete(post)
-
-        await self.session.commit()
+        deleted = await self.session.execute(
+            delete(Post)
+            .where(Post.request_id == request_filter_id, Post.lot_id.not_in(lot_ids))
+            .execution_options(synchronize_session=False)
+        )
+        seen_lot_index.discard(deleted.rowcount)
+        await self._commit()
 
-        return posts_to_keep
+        result = await self.session.execute(
+            select(Post)
+            .where(Post.request_id == request_filter_id, Post.lot_id.in_(lot_ids))
+            .order_by(Post.id)
+            # Core UPDATEs of this session (average prices, image analysis) bypass already loaded posts
+            .execution_options(populate_existing=True)
+        )
+        return list(result.scalars().all())
 
     async def get_by_request_id(self, request_id: int) -> Sequence[Post]:
         stmt = select(Post).where(Post.request_id == request_id)
@@ -53,4 +99,66 @@ class PostService(BaseService[Post, PostCreate, PostUpdate]):
     async def get_by_request_id_and_lot_id(self, request_id: int, lot_id: int) -> Sequence[Post]:
         stmt = select(Post).where(Post.request_id == request_id, Post.lot_id == lot_id)
         result = await self.session.execute(stmt)
-        return result.scalars().all()
\ No newline at end of file
+        return result.scalars().all()
+
+    async def clone_to_request(self, post_ids: list[int], request_id: int) -> list[Post]:
+        result = await self.session.execute(select(Post).where(Post.id.in_(post_ids)).order_by(Post.id))
+        skip = {'id', 'request_id', 'is_posted', 'created_at'}
+        columns = [column.key for column in Post.__table__.columns if column.key not in skip]
+
+        clones = [
+            Post(**{column: getattr(post, column) for column in columns},
+                 request_id=request_id,
+                 created_at=datetime.now(UTC))
+            for post in result.scalars().all()
+        ]
+        self.session.add_all(clones)
+        await self._commit()
+        if clones:
+            seen_lot_index.add(post.lot_id for post in clones)
+        return clones
+
+    async def get_with_image_analysis(self, lot_ids: list[int]) -> Sequence[Post]:
+        stmt = select(Post).where(
+            Post.lot_id.in_(lot_ids),
+            Post.image_description.is_not(None),
+            Post.image_score.is_not(None)
+        ).order_by(Post.id.desc())
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def bulk_update_average_prices(self, request_id: int, prices: dict[int, int | None]) -> None:
+        if not prices:
+            return
+        # Core executemany: one prepared UPDATE for all lots of the request
+        table = Post.__table__
+        stmt = (
+            update(table)
+            .where(table.c.request_id == bindparam('b_request_id'), table.c.lot_id == bindparam('b_lot_id'))
+            .values(average_sell_price=bindparam('b_average_sell_price'))
+        )
+        await self.session.execute(stmt, [
+            {'b_request_id': request_id, 'b_lot_id': lot_id, 'b_average_sell_price': price}
+            for lot_id, price in prices.items()
+        ])
+        await self._commit()
+
+    async def bulk_update_image_analysis(self, request_id: int, analyses: dict[int, Any]) -> None:
+        if not analyses:
+            return
+        table = Post.__table__
+        stmt = (
+            update(table)
+            .where(table.c.request_id == bindparam('b_request_id'), table.c.lot_id == bindparam('b_lot_id'))
+            .values(image_description=bindparam('b_image_description'), image_score=bindparam('b_image_score'))
+        )
+        await self.session.execute(stmt, [
+            {
+                'b_request_id': request_id,
+                'b_lot_id': lot_id,
+                'b_image_description': analysis.description,
+                'b_image_score': analysis.condition_score
+            }
+            for lot_id, analysis in analyses.items()
+        ])
+        await self._commit()
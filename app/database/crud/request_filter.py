@@ -1,4 +1,5 @@
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.crud.base import BaseService
@@ -10,4 +11,20 @@ class RequestFiltersService(BaseService[RequestFilters, RequestFiltersCreate, Re
     def __init__(self, session: AsyncSession):
         super().__init__(RequestFilters, session)
 
+    async def get_with_posts(self, request_id: int) -> RequestFilters | None:
+        result = await self.session.execute(
+            select(RequestFilters)
+            .where(RequestFilters.id == request_id)
+            .options(selectinload(RequestFilters.posts))
+            .execution_options(populate_existing=True)
+        )
+        return result.scalars().first()
 
+    async def delete(self, obj_id: int) -> bool:
+        # The delete-orphan cascade has to see the posts, and the relationship never loads them implicitly
+        obj = await self.get_with_posts(obj_id)
+        if not obj:
+            return False
+        await self.session.delete(obj)
+        await self._commit()
+        return True
@@ -1,8 +1,13 @@
+import asyncio
+import time
 from contextlib import asynccontextmanager
+from contextvars import ContextVar, Token
 from typing import Any, AsyncGenerator
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 
 from app.config import settings
+from app.core.metrics import metrics
 
 if settings.DEBUG:
     SQLALCHEMY_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./db.sqlite"
@@ -10,19 +15,129 @@ else:
     SQLALCHEMY_ASYNC_DATABASE_URL = f'postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASS}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}'
 
 
-engine_async: AsyncEngine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, echo=False)
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    metrics.inc('db.pool.checkouts')
+    metrics.add_gauge('db.pool.checked_out', 1)
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    metrics.add_gauge('db.pool.checked_out', -1)
+
+
+def create_engine_from_settings(url: str) -> AsyncEngine:
+    connect_args = {}
+    if url.startswith('postgresql+asyncpg'):
+        connect_args = {
+            # SQLAlchemy's cache of asyncpg prepared statements, and asyncpg's own
+            'prepared_statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+            'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+        }
+
+    engine = create_async_engine(
+        url,
+        echo=False,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine.sync_engine, 'connect', _set_sqlite_pragmas)
+    event.listen(engine.sync_engine, 'checkout', _on_checkout)
+    event.listen(engine.sync_engine, 'checkin', _on_checkin)
+    return engine
+
+
+engine_async: AsyncEngine = create_engine_from_settings(SQLALCHEMY_ASYNC_DATABASE_URL)
 AsyncSessionLocal = async_sessionmaker(
     bind=engine_async,
     expire_on_commit=False,
     class_=AsyncSession,
 )
 
+
+class UnitOfWork:
+    """
+    One session shared by every ``get_async_db()`` in the current context.
+
+    Services only flush inside it; the owner commits at its own boundaries with
+    ``commit()``, and whatever is left is committed on a clean exit. Concurrent
+    tasks of the context take turns on the session through a lock.
+    """
+
+    def __init__(self):
+        self.session: AsyncSession = AsyncSessionLocal(info={'unit_of_work': True})
+        self.lock = asyncio.Lock()
+        self._token: Token | None = None
+
+    async def commit(self):
+        async with self.lock:
+            await self.session.commit()
+
+    async def rollback(self):
+        async with self.lock:
+            await self.session.rollback()
+
+    async def __aenter__(self) -> 'UnitOfWork':
+        self._token = _unit_of_work.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        _unit_of_work.reset(self._token)
+        try:
+            if exc_type is None:
+                await self.commit()
+            else:
+                await self.rollback()
+        finally:
+            await self.session.close()
+
+
+_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar('unit_of_work', default=None)
+
+
+async def _acquire_connection(session: AsyncSession):
+    # Takes the connection up front so time spent waiting on the pool is measured
+    if session.in_transaction():
+        return
+    started = time.perf_counter()
+    await session.connection()
+    metrics.inc('db.pool.acquires')
+    metrics.inc('db.pool.acquire_wait_seconds', time.perf_counter() - started)
+
+
+def in_unit_of_work(session: AsyncSession) -> bool:
+    return session.info.get('unit_of_work', False)
+
+
 @asynccontextmanager
 async def get_async_db()-> AsyncGenerator[AsyncSession | Any, Any]:
-    async with AsyncSessionLocal() as session:
-        yield session
+    unit_of_work = _unit_of_work.get()
+    if unit_of_work is None:
+        async with AsyncSessionLocal() as session:
+            await _acquire_connection(session)
+            yield session
+        return
+
+    async with unit_of_work.lock:
+        try:
+            await _acquire_connection(unit_of_work.session)
+            yield unit_of_work.session
+        except BaseException:
+            # Only the current stage is lost; earlier stages are already committed
+            await unit_of_work.session.rollback()
+            raise
 
 async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         return session
-
@@ -1,3 +1,4 @@
 from .base import Base
+from .outbox import OutboxMessage
 from .post import Post
 from .request_filters import RequestFilters
\ No newline at end of file
@@ -2,7 +2,7 @@ import enum
 from datetime import datetime, UTC
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, Enum, ForeignKey
+from sqlalchemy import DateTime, Enum, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -13,9 +13,12 @@ if TYPE_CHECKING:
 
 class Post(Base):
     __tablename__ = "post"
+    __table_args__ = (
+        UniqueConstraint('request_id', 'lot_id', name='uq_post_request_id_lot_id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    lot_id: Mapped[int] = mapped_column(nullable=False)
+    lot_id: Mapped[int] = mapped_column(nullable=False, index=True)
     auction: Mapped[AuctionEnum] = mapped_column(Enum(AuctionEnum), nullable=False)
 
     title: Mapped[str] = mapped_column(nullable=False)
@@ -45,5 +48,5 @@ class Post(Base):
     request: Mapped["RequestFilters"] = relationship(
         "RequestFilters",
         back_populates="posts",
-        lazy="selectin"
+        lazy="raise"
     )
\ No newline at end of file
@@ -15,7 +15,7 @@ class RequestFilters(Base):
     __tablename__ = "request_filters"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_uuid: Mapped[str] = mapped_column(nullable=False)
+    user_uuid: Mapped[str] = mapped_column(nullable=False, index=True)
 
     site: Mapped[AuctionEnum] = mapped_column(Enum(AuctionEnum),nullable=False)
     make: Mapped[str] = mapped_column(nullable=False)
@@ -34,5 +34,5 @@ class RequestFilters(Base):
         "Post",
         back_populates="request",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise",
     )
\ No newline at end of file
@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import math
+from typing import Awaitable, Callable, Iterable
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.core.logger import logger
+from app.core.metrics import metrics
+from app.database.db.session import AsyncSessionLocal
+from app.database.models import Post
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over integer keys (double hashing on one blake2b digest)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: int) -> Iterable[int]:
+        digest = hashlib.blake2b(key.to_bytes(8, 'little', signed=True), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key: int) -> bool:
+        """Returns whether the key was new; re-adding a key does not count it again."""
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, key: int) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SeenLotIndex:
+    """
+    Process-local index of lot ids that already have a post.
+
+    A miss is only definite for posts this process has seen: its own inserts and
+    whatever the last refresh read. Posts that other consumers committed since then
+    reach the filter on the next incremental refresh on ``post.id``, so misses are
+    still checked in the DB against the posts past the refresh window. That lookup
+    only scans the newest ids. Lots the filter may contain are checked in the DB as
+    before.
+
+    The refresh watermark only advances past rows it has read, and each refresh
+    rereads the last ``refresh_overlap`` ids, since concurrent transactions may
+    commit lower ids after higher ones. Deleted posts stay in the filter as false
+    positives until the next rebuild.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, refresh_overlap: int, load_chunk_size: int = 50_000):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_overlap = refresh_overlap
+        self.load_chunk_size = load_chunk_size
+        self._filter: BloomFilter | None = None
+        self._last_post_id = 0
+        self._stale = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def add(self, lot_ids: Iterable[int]):
+        # Only the lots; the watermark is left to refresh, which reads what others committed too
+        if self._filter is None:
+            return
+        for lot_id in lot_ids:
+            self._filter.add(int(lot_id))
+        metrics.set_gauge('seen_lots.size', self._filter.count)
+
+    def discard(self, count: int):
+        # Bloom filters cannot forget; removed lots are counted towards the next rebuild
+        self._stale += max(0, count)
+
+    async def _load(self, bloom: BloomFilter, after_id: int) -> int:
+        last_id = after_id
+        async with AsyncSessionLocal() as session:
+            while True:
+                rows = (await session.execute(
+                    select(Post.id, Post.lot_id).where(Post.id > last_id).order_by(Post.id).limit(self.load_chunk_size)
+                )).all()
+                for post_id, lot_id in rows:
+                    bloom.add(lot_id)
+                if not rows:
+                    return last_id
+                last_id = rows[-1][0]
+                # Hashing a chunk is CPU bound; give other tasks a turn between chunks
+                await asyncio.sleep(0)
+
+    async def rebuild(self):
+        async with AsyncSessionLocal() as session:
+            post_count = (await session.execute(select(func.count(Post.id)))).scalar_one()
+        bloom = BloomFilter(max(self.capacity, post_count * 2), self.error_rate)
+        last_id = await self._load(bloom, 0)
+        self._filter, self._last_post_id, self._stale = bloom, last_id, 0
+        metrics.set_gauge('seen_lots.size', bloom.count)
+        logger.info(f'Seen lot index built from {bloom.count} posts', extra={'bits': bloom.size})
+
+    async def refresh(self):
+        if self._filter is None:
+            return await self.rebuild()
+        if self._filter.count + self._stale > self._filter.capacity or self._stale > self._filter.capacity // 4:
+            return await self.rebuild()
+        last_id = await self._load(self._filter, max(0, self._last_post_id - self.refresh_overlap))
+        self._last_post_id = max(self._last_post_id, last_id)
+        metrics.set_gauge('seen_lots.size', self._filter.count)
+
+    async def run(self, interval: float):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f'Error refreshing seen lot index: {e}')
+            await asyncio.sleep(interval)
+
+    async def repeated_lot_ids(
+            self,
+            lot_ids: list[int],
+            lookup: Callable[[list[int], int | None], Awaitable[Iterable[int]]]
+    ) -> set[int]:
+        """
+        Lot ids that already have a post.
+
+        ``lookup(lot_ids, after_post_id)`` asks the DB about the given lots, limited to
+        posts with a greater id when ``after_post_id`` is set.
+        """
+        if self._filter is None:
+            return set(await lookup(lot_ids, None))
+
+        candidates, misses = [], []
+        for lot_id in lot_ids:
+            (candidates if int(lot_id) in self._filter else misses).append(lot_id)
+        metrics.inc('seen_lots.checked', len(lot_ids))
+        metrics.inc('seen_lots.db_checked', len(candidates))
+
+        repeated = set(await lookup(candidates, None)) if candidates else set()
+        if misses:
+            # Other consumers' posts committed since the last refresh are not in the filter yet
+            recent = set(await lookup(misses, max(0, self._last_post_id - self.refresh_overlap)))
+            metrics.inc('seen_lots.recent_hits', len(recent))
+            repeated |= recent
+        return repeated
+
+
+seen_lot_index = SeenLotIndex(settings.SEEN_LOTS_CAPACITY, settings.SEEN_LOTS_ERROR_RATE,
+                              refresh_overlap=settings.SEEN_LOTS_REFRESH_OVERLAP_IDS)
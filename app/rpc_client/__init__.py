@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Generated proto modules import each other as top-level packages (auction, calculator, ...),
+# so gen/python has to be on sys.path before any client module is imported
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'gen', 'python'))
@@ -1,15 +1,9 @@
-import os
-import sys
-
 import grpc
 
 from app.config import settings
 from app.rpc_client.base_client import BaseRpcClient, T
 from app.services.ai_post_generation.types import Filters
 
-# Ensure generated proto packages (auction, carfax, payment) are importable
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'gen', 'python'))
-
 from app.rpc_client.gen.python.auction.v1 import lot_pb2_grpc, lot_pb2
 
 
@@ -3,8 +3,115 @@ from abc import abstractmethod, ABC
 from typing import TypeVar, Generic, Optional, Callable, Any, Dict
 import grpc
 
+from app.config import settings
+from app.core.logger import logger
+
 
 T = TypeVar('T')
+ChannelKey = tuple[str, tuple[tuple[str, Any], ...]]
+
+
+class RpcChannelPool:
+    """
+    Process-wide registry of gRPC channels, one per (target, options).
+
+    Channels are created lazily on first use and shared by every client
+    instance, so a request does not pay a TCP/HTTP2 handshake per call.
+    gRPC reconnects a channel by itself (with backoff); the pool only replaces
+    channels that were shut down or did not recover within the ready timeout.
+    """
+
+    def __init__(self):
+        self._channels: dict[ChannelKey, grpc.aio.Channel] = {}
+        self._locks: dict[ChannelKey, asyncio.Lock] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self):
+        # grpc.aio channels are bound to the loop they were created in
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._channels.clear()
+            self._locks.clear()
+            self._loop = loop
+
+    async def get_channel(
+            self,
+            target: str,
+            options: list[tuple[str, Any]],
+            ready_timeout: float
+    ) -> grpc.aio.Channel:
+        self._bind_loop()
+        key: ChannelKey = (target, tuple(options))
+
+        channel = self._channels.get(key)
+        if channel is not None and self._is_usable(channel):
+            return channel
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            channel = self._channels.get(key)
+            if channel is not None:
+                if self._is_usable(channel):
+                    return channel
+                if await self._recovered(channel, ready_timeout):
+                    return channel
+                logger.warning(
+                    "gRPC channel is unhealthy, recreating",
+                    extra={"target": target}
+                )
+                self._channels.pop(key, None)
+                await self._close_channel(channel)
+
+            channel = grpc.aio.insecure_channel(target, options=options)
+            try:
+                await asyncio.wait_for(channel.channel_ready(), timeout=ready_timeout)
+            except BaseException:
+                await self._close_channel(channel)
+                raise
+
+            self._channels[key] = channel
+            logger.info("gRPC channel created", extra={"target": target})
+            return channel
+
+    @staticmethod
+    def _is_usable(channel: grpc.aio.Channel) -> bool:
+        state = channel.get_state(try_to_connect=True)
+        return state in (
+            grpc.ChannelConnectivity.READY,
+            grpc.ChannelConnectivity.IDLE,
+            grpc.ChannelConnectivity.CONNECTING,
+        )
+
+    @staticmethod
+    async def _recovered(channel: grpc.aio.Channel, timeout: float) -> bool:
+        if channel.get_state() == grpc.ChannelConnectivity.SHUTDOWN:
+            return False
+        try:
+            await asyncio.wait_for(channel.channel_ready(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    @staticmethod
+    async def _close_channel(channel: grpc.aio.Channel):
+        try:
+            await channel.close()
+        except Exception as e:
+            logger.warning("Error while closing gRPC channel", extra={"error": str(e)})
+
+    async def close(self):
+        channels = list(self._channels.values())
+        self._channels.clear()
+        self._locks.clear()
+        for channel in channels:
+            await self._close_channel(channel)
+        if channels:
+            logger.info("gRPC channels closed", extra={"count": len(channels)})
+
+
+rpc_channel_pool = RpcChannelPool()
+
+
 class BaseRpcClient(Generic[T], ABC):
     def __init__(
             self,
@@ -22,6 +129,13 @@ class BaseRpcClient(Generic[T], ABC):
         self.channel_options = [
             ('grpc.max_receive_message_length', max_receive_message_length),
             ('grpc.max_send_message_length', max_send_message_length),
+            ('grpc.keepalive_time_ms', settings.RPC_KEEPALIVE_TIME_MS),
+            ('grpc.keepalive_timeout_ms', settings.RPC_KEEPALIVE_TIMEOUT_MS),
+            ('grpc.keepalive_permit_without_calls', int(settings.RPC_KEEPALIVE_PERMIT_WITHOUT_CALLS)),
+            ('grpc.http2.max_pings_without_data', 0),
+            ('grpc.initial_reconnect_backoff_ms', settings.RPC_INITIAL_RECONNECT_BACKOFF_MS),
+            ('grpc.max_reconnect_backoff_ms', settings.RPC_MAX_RECONNECT_BACKOFF_MS),
+            ('grpc.enable_retries', 1),
         ]
         self.compression = compression
 
@@ -32,28 +146,17 @@ class BaseRpcClient(Generic[T], ABC):
     async def connect(self):
         if self.channel is not None:
             return
-        try:
-            self.channel = grpc.aio.insecure_channel(
-                self.server_url,
-                options=self.channel_options
-            )
-            self.stub = self._create_stub(self.channel)
-
-            await asyncio.wait_for(
-                self.channel.channel_ready(),
-                timeout=self.timeout
-            )
-        except Exception as e:
-            await self.disconnect()
-            raise
+        self.channel = await rpc_channel_pool.get_channel(
+            self.server_url,
+            self.channel_options,
+            ready_timeout=self.timeout
+        )
+        self.stub = self._create_stub(self.channel)
 
     async def disconnect(self):
-        if self.channel:
-            try:
-                await self.channel.close()
-            finally:
-                self.channel = None
-                self.stub = None
+        # The channel is shared through rpc_channel_pool and closed on shutdown
+        self.channel = None
+        self.stub = None
 
     async def __aenter__(self):
         await self.connect()
@@ -93,4 +196,4 @@ class BaseRpcClient(Generic[T], ABC):
             timeout=request_timeout
         )
 
-        return response
\ No newline at end of file
+        return response
@@ -1,6 +1,7 @@
 import grpc
 
 from app.config import settings
+from app.core.cache import AsyncTTLCache
 from app.database.enums import AuctionEnum
 from app.rpc_client.base_client import BaseRpcClient, T
 from app.rpc_client.gen.python.calculator.v1 import calculator_pb2, calculator_pb2_grpc
@@ -25,4 +26,31 @@ class CalculatorRcpClient(BaseRpcClient[calculator_pb2_grpc.CalculatorServiceStu
         return await self._execute_request(self.stub.GetCalculatorWithData, data)
 
 
-
+# Transportation and ocean prices of a price=1 calculation depend only on the yard
+base_calculator_cache: AsyncTTLCache[tuple[str, str, str], calculator_pb2.GetCalculatorWithDataResponse | None] = \
+    AsyncTTLCache('calculator', max_size=settings.CALCULATOR_CACHE_MAX_SIZE, ttl=settings.CALCULATOR_CACHE_TTL_SECONDS)
+
+
+async def _fetch_base_calculator(auction: AuctionEnum, vehicle_type: str,
+                                 location: str) -> calculator_pb2.GetCalculatorWithDataResponse | None:
+    async with CalculatorRcpClient() as client:
+        try:
+            return await client.get_calculator_with_data(
+                price=1,
+                auction=auction,
+                vehicle_type=vehicle_type,
+                location=location
+            )
+        except grpc.aio.AioRpcError as e:
+            # A yard without calculator data is cached as None; transient errors are not cached
+            if e.code() == grpc.StatusCode.NOT_FOUND:
+                return None
+            raise
+
+
+async def get_base_calculator(auction: AuctionEnum, vehicle_type: str,
+                              location: str) -> calculator_pb2.GetCalculatorWithDataResponse | None:
+    return await base_calculator_cache.get_or_load(
+        (auction.value, vehicle_type, location),
+        lambda: _fetch_base_calculator(auction, vehicle_type, location)
+    )
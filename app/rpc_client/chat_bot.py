@@ -1,14 +1,8 @@
-import os
-import sys
-
 import grpc
 
 from app.config import settings
 from app.rpc_client.base_client import BaseRpcClient, T
 
-# Ensure generated proto packages (auction, carfax, payment) are importable
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'gen', 'python'))
-
 from app.rpc_client.gen.python.chat_bot.v1 import chat_bot_pb2_grpc, chat_bot_pb2
 
 
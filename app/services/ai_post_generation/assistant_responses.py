@@ -0,0 +1,104 @@
+import ast
+import asyncio
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError, field_validator
+
+from app.config import settings
+
+
+class AssistantResponseError(ValueError):
+    pass
+
+
+class ChosenLot(BaseModel):
+    lot_id: int
+
+    model_config = ConfigDict(extra='ignore')
+
+
+class LotsResponse(BaseModel):
+    lots: list[ChosenLot] = []
+
+    model_config = ConfigDict(extra='ignore')
+
+    @field_validator('lots', mode='before')
+    @classmethod
+    def drop_empty_lots(cls, value: Any) -> Any:
+        if isinstance(value, list):
+            return [lot for lot in value if lot]
+        return value
+
+
+class LotChooserResponse(LotsResponse):
+    pass
+
+
+class FullLotProcessorResponse(LotsResponse):
+    pass
+
+
+class LotImagesResponse(BaseModel):
+    lot_id: int | None = None
+    description: str = ''
+    condition_score: int = 0
+
+    model_config = ConfigDict(extra='ignore')
+
+    @field_validator('condition_score', mode='before')
+    @classmethod
+    def round_score(cls, value: Any) -> Any:
+        if isinstance(value, float):
+            return round(value)
+        return value
+
+
+ASSISTANT_RESPONSE_ADAPTERS: dict[str, TypeAdapter] = {
+    'lot_chooser': TypeAdapter(LotChooserResponse),
+    'lot_images_processor': TypeAdapter(LotImagesResponse),
+    'full_lot_processor': TypeAdapter(FullLotProcessorResponse),
+}
+
+
+def _is_invalid_json(error: ValidationError) -> bool:
+    return any(item['type'] == 'json_invalid' for item in error.errors())
+
+
+def parse_assistant_text(adapter: TypeAdapter, text: str) -> Any:
+    # Assistants are asked for JSON, but some replies are Python literals (single quotes, None)
+    try:
+        return adapter.validate_json(text)
+    except ValidationError as e:
+        if not _is_invalid_json(e):
+            raise
+
+    try:
+        payload = ast.literal_eval(text)
+    except (ValueError, SyntaxError, MemoryError, RecursionError) as e:
+        raise AssistantResponseError(f'Assistant response is neither JSON nor a Python literal: {e}') from e
+    return adapter.validate_python(payload)
+
+
+async def decode_assistant_response(assistant_name: str, response: dict[str, Any]) -> Any:
+    """
+    Validates the ``data.response`` of an assistant RPC reply into its model.
+
+    Large replies are parsed in a worker thread so the event loop is not blocked.
+    """
+    adapter = ASSISTANT_RESPONSE_ADAPTERS.get(assistant_name)
+    if adapter is None:
+        raise AssistantResponseError(f'Unknown assistant: {assistant_name}')
+
+    data = response.get('data') or {}
+    raw = data.get('response')
+    if not raw:
+        raise AssistantResponseError(f'Empty response from assistant {assistant_name}')
+
+    try:
+        if isinstance(raw, (dict, list)):
+            return adapter.validate_python(raw)
+        if len(raw) >= settings.AI_RESPONSE_THREAD_DECODE_MIN_CHARS:
+            return await asyncio.to_thread(parse_assistant_text, adapter, raw)
+        return parse_assistant_text(adapter, raw)
+    except ValidationError as e:
+        raise AssistantResponseError(f'Invalid response from assistant {assistant_name}: {e}') from e
@@ -0,0 +1,75 @@
+import asyncio
+
+from app.config import settings
+from app.core.cache import AsyncTTLCache
+from app.core.logger import logger
+from app.rpc_client.auction_api import ApiRpcClient
+from app.rpc_client.gen.python.auction.v1 import lot_pb2
+
+# (make, model, year_from, year_to, period)
+AveragePriceKey = tuple[str, str, int | None, int | None, int]
+
+average_price_cache: AsyncTTLCache[AveragePriceKey, int | None] = AsyncTTLCache(
+    'average_price',
+    max_size=settings.AVERAGE_PRICE_CACHE_MAX_SIZE,
+    ttl=settings.AVERAGE_PRICE_CACHE_TTL_SECONDS
+)
+
+
+class AveragePriceService:
+    period: int = 6
+
+    @classmethod
+    def key_for_lot(cls, lot: lot_pb2.Lot) -> AveragePriceKey:
+        year_from = None
+        year_to = None
+        if lot.year:
+            year_from = lot.year - 1
+            year_to = lot.year + 1
+        return lot.make, lot.model, year_from, year_to, cls.period
+
+    @classmethod
+    async def _fetch(cls, key: AveragePriceKey) -> int | None:
+        make, model, year_from, year_to, period = key
+        async with ApiRpcClient() as client:
+            response = await client.get_average_price(make, model,
+                                                      year_from=year_from,
+                                                      year_to=year_to,
+                                                      period=period)
+
+        logger.debug(f'Response avg prices: {list(response.stats)}')
+        avg_prices = [item.total for item in response.stats]
+        if not avg_prices:
+            return None
+        avg = round(sum(avg_prices) / len(avg_prices))
+        logger.debug(f'Avg for {key}: {avg}')
+        return avg
+
+    @classmethod
+    async def get_for_lot(cls, lot: lot_pb2.Lot) -> int | None:
+        key = cls.key_for_lot(lot)
+        return await average_price_cache.get_or_load(key, lambda: cls._fetch(key))
+
+    @classmethod
+    async def get_for_lots(
+            cls,
+            lots: list[lot_pb2.Lot],
+            concurrency: int = settings.AVERAGE_PRICE_CONCURRENCY
+    ) -> dict[int, int | None]:
+        """Average sell price per lot id; lots whose lookup failed are left out."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def get_price(lot: lot_pb2.Lot) -> int | None:
+            async with semaphore:
+                return await cls.get_for_lot(lot)
+
+        results = await asyncio.gather(*(get_price(lot) for lot in lots), return_exceptions=True)
+
+        prices = {}
+        for lot, result in zip(lots, results):
+            if isinstance(result, Exception):
+                logger.error(f'Error getting average price for lot {lot.lot_id}: {result}',
+                             extra={'lot_id': lot.lot_id})
+                continue
+            prices[lot.lot_id] = result
+        return prices
@@ -0,0 +1,77 @@
+import hashlib
+import json
+
+from app.config import settings
+from app.core.cache import AsyncTTLCache
+from app.core.logger import logger
+from app.core.metrics import metrics
+from app.database.crud.post import PostService
+from app.database.db.session import UnitOfWork, get_async_db
+from app.services.ai_post_generation.generate_post import GeneratePost
+from app.services.ai_post_generation.types import Filters
+
+
+class GenerationFailed(Exception):
+    pass
+
+
+class GenerationCoalescer:
+    """
+    Runs one generation pipeline per distinct ``Filters`` at a time.
+
+    The first request for a filters hash leads and answers its user itself. Concurrent
+    requests with the same filters, and repeats within the result TTL, wait for the
+    leader and get copies of its posts under their own request id.
+    """
+
+    def __init__(self, results: AsyncTTLCache[str, list[int]]):
+        self.results = results
+
+    @staticmethod
+    def filters_key(filters: Filters) -> str:
+        canonical = {
+            name: value.strip().casefold() if isinstance(value, str) else value
+            for name, value in filters.model_dump().items()
+            if value is not None
+        }
+        return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+    async def generate(self, generator: GeneratePost):
+        key = self.filters_key(generator.filters)
+        leader = False
+
+        async def run() -> list[int]:
+            nonlocal leader
+            leader = True
+            posts = await generator.generate_post()
+            if not posts:
+                raise GenerationFailed(f'Generation for request {generator.request_id} produced no posts')
+            return [post.id for post in posts]
+
+        try:
+            post_ids = await self.results.get_or_load(key, run)
+        except GenerationFailed:
+            if not leader:
+                # The leader already reported the details to its own user
+                await generator.send_error_to_user(f'Could not generate posts for these filters, try again later\n'
+                                                   f'request id: {generator.request_id}')
+            return
+
+        if leader:
+            return
+
+        metrics.inc('generation.coalesced')
+        logger.info(f'Request {generator.request_id} reuses posts of an identical generation',
+                    extra={'request_id': generator.request_id, 'filters_key': key})
+        # The copies and the response that points to them are committed together
+        async with UnitOfWork():
+            async with get_async_db() as db:
+                posts = await PostService(db).clone_to_request(post_ids, generator.request_id)
+            await generator.send_response_to_user(posts)
+
+
+generation_coalescer = GenerationCoalescer(
+    AsyncTTLCache('generation_results',
+                  max_size=settings.GENERATION_RESULT_CACHE_MAX_SIZE,
+                  ttl=settings.GENERATION_RESULT_CACHE_TTL_SECONDS)
+)
@@ -1,24 +1,31 @@
-import ast
 import asyncio
+from datetime import datetime, UTC
 from typing import Any
 
 from dateutil import parser
 import grpc
 
+from app.config import settings
 from app.core.logger import logger, log_async_execution_time, async_timer
+from app.core.metrics import metrics
+from app.database.crud.outbox import OutboxService
 from app.database.crud.post import PostService
-from app.database.db.session import get_async_db
+from app.database.db.session import UnitOfWork, get_async_db
 from app.database.enums import AuctionEnum
 from app.database.models import Post
-from app.database.schemas.post import PostCreate, PostUpdate
-from app.rpc_client.auction_api import ApiRpcClient
-from app.rpc_client.calculator import CalculatorRcpClient
+from app.rpc_client.calculator import get_base_calculator
 from app.rpc_client.gen.python.auction.v1 import lot_pb2
 from app.rpc_client.gen.python.calculator.v1 import calculator_pb2
 from app.services.ai_post_generation.ai_service import Transformers
+from app.services.ai_post_generation.assistant_responses import LotImagesResponse, decode_assistant_response
+from app.services.ai_post_generation.average_price import AveragePriceService
+from app.services.ai_post_generation.image_analysis import ImageAnalysisService
+from app.services.ai_post_generation.lot_source import PrefetchingLotSource
+from app.services.ai_post_generation.pipeline import Stage, StreamingPipeline
 from app.services.ai_post_generation.post_serializer import SerializePost
+from app.services.ai_post_generation.response_cache import assistant_response_cache
 from app.services.ai_post_generation.types import Filters
-from app.services.rabbit.rabbit_service import RabbitMQPublisher
+from app.services.rabbit.rabbit_service import rabbit_publisher
 
 
 class GeneratePost:
@@ -26,147 +33,94 @@ class GeneratePost:
         self.filters = filters
         self.user_uuid = user_uuid
         self.request_id = request_id
-        self.auction_api_client = ApiRpcClient()
 
-    async def _get_search_results_from_api(self, page: int = 1)-> lot_pb2.GetCurrentLotsByFiltersResponse | None:
-        async with self.auction_api_client as client:
-
-            return await client.get_current_lots_with_filters(
-                self.filters,
-                page=page
-            )
     @classmethod
     async def get_calculator_for_lot(cls, lot: lot_pb2.Lot) -> calculator_pb2.GetCalculatorWithDataResponse | None:
-        async with CalculatorRcpClient() as client:
-            try:
-                response = await client.get_calculator_with_data(
-                    price=1,
-                    auction=AuctionEnum(lot.base_site.lower()),
-                    vehicle_type=lot.vehicle_type,
-                    location=lot.location
-                )
-                return response
-            except grpc.aio.AioRpcError as e:
-                logger.warning(f'For lot: {lot.lot_id} data for calculator was not found (Rpc Request)',
-                               extra={'error_code': str(e.code()), 'error_details': str(e.details())})
-                return None
-    @log_async_execution_time('Get calculator for lots')
-    async def get_calculators_for_lots(self, lots: list[lot_pb2.Lot]) -> list[tuple[lot_pb2.Lot, calculator_pb2.GetCalculatorWithDataResponse]]:
-        lots_with_calculators = []
-
-        async def get_calculator(lot: lot_pb2.Lot) -> None:
-            try:
-                calculator = await self.get_calculator_for_lot(lot)
-                if calculator:
-                    lots_with_calculators.append((lot, calculator))
-            except Exception as e:
-                logger.error(f"Error getting calculator for lot {lot.lot_id}: {e}")
+        try:
+            response = await get_base_calculator(
+                auction=AuctionEnum(lot.base_site.lower()),
+                vehicle_type=lot.vehicle_type,
+                location=lot.location
+            )
+        except grpc.aio.AioRpcError as e:
+            logger.warning(f'For lot: {lot.lot_id} data for calculator was not found (Rpc Request)',
+                           extra={'error_code': str(e.code()), 'error_details': str(e.details())})
+            return None
 
-        tasks = [asyncio.create_task(get_calculator(lot)) for lot in lots]
-        await asyncio.gather(*tasks)
+        if response is None:
+            logger.warning(f'For lot: {lot.lot_id} data for calculator was not found (Rpc Request)',
+                           extra={'location': lot.location})
+        return response
 
-        return lots_with_calculators
+    @staticmethod
+    def parse_auction_date(value: str) -> datetime | None:
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return parser.parse(value)
 
-    async def process_repeated_posts(self, lots: list[lot_pb2.Lot]) -> list[lot_pb2.Lot]:
-        async with get_async_db() as db:
-            post_service = PostService(db)
-            lot_ids_with_calculator = [lot.lot_id for lot in lots]
-            repeated_posts_lot_ids = await post_service.get_repeated_posts(lot_ids_with_calculator, return_ids=True)
-            logger.debug(f'Repeated posts IDs: {repeated_posts_lot_ids}')
-            logger.debug(f'Repeated posts IDs types: {[type(x) for x in repeated_posts_lot_ids]}')
-            logger.debug(f'First lot ID: {lots[0].lot_id}, type: {type(lots[0].lot_id)}')
-            return self.exclude_lots_by_lot_ids(repeated_posts_lot_ids, lots)
+    def build_post_row(
+            self,
+            lot: lot_pb2.Lot,
+            calculator: calculator_pb2.GetCalculatorWithDataResponse,
+            created_at: datetime
+    ) -> dict[str, Any]:
+        return {
+            'lot_id': lot.lot_id,
+            'auction': AuctionEnum(lot.base_site),
+            'title': lot.title,
+            'odometer': lot.odometer,
+            'vin': lot.vin,
+            'status': lot.status,
+            'year': lot.year,
+            'auction_date': self.parse_auction_date(lot.auction_date),
+            'delivery_price': calculator.data.calculator.transportation_price[0].price,
+            'shipping_price': calculator.data.calculator.ocean_ship[0].price,
+            'average_sell_price': None,
+            'is_posted': False,
+            'request_id': self.request_id,
+            'images': ','.join(list(lot.link_img_hd)[:10]),
+            'created_at': created_at
+        }
 
     async def create_posts_batch(
             self,
             lots_with_calculators: list[tuple[lot_pb2.Lot, calculator_pb2.GetCalculatorWithDataResponse]]
     ) -> list[lot_pb2.Lot]:
-        processed_lots = []
+        created_at = datetime.now(UTC)
+        rows = []
+        for lot, calculator in lots_with_calculators:
+            try:
+                rows.append(self.build_post_row(lot, calculator, created_at))
+            except Exception as e:
+                logger.error(f"Error processing lot {lot.lot_id} to DB: {e}")
 
         async with get_async_db() as db:
-            post_service = PostService(db)
+            posts = await PostService(db).bulk_create(rows)
 
-            for lot_calculator_pair in lots_with_calculators:
-                lot, calculator = lot_calculator_pair
-                try:
-                    await post_service.create(PostCreate(
-                        lot_id=lot.lot_id,
-                        auction=AuctionEnum(lot.base_site),
-                        title=lot.title,
-                        odometer=lot.odometer,
-                        vin=lot.vin,
-                        status=lot.status,
-                        year=lot.year,
-                        auction_date=parser.parse(lot.auction_date) if lot.auction_date else None,
-                        delivery_price=calculator.data.calculator.transportation_price[0].price,
-                        shipping_price=calculator.data.calculator.ocean_ship[0].price,
-                        average_sell_price=None,
-                        request_id=self.request_id,
-                        images=','.join(list(lot.link_img_hd)[:10])
-                    ), flush=True)
-                    processed_lots.append(lot)
-                except Exception as e:
-                    logger.error(f"Error processing lot {lot.lot_id} to DB: {e}")
-
-            await db.commit()
-
-        return processed_lots
+        created_lot_ids = {post.lot_id for post in posts}
+        return [lot for lot, _ in lots_with_calculators if lot.lot_id in created_lot_ids]
 
     async def left_only_this_lot_ids_db(self, lot_ids: list[int])-> list[Post]:
         async with get_async_db() as db:
             post_service = PostService(db)
             return await post_service.left_only_this_lot_ids(self.request_id, lot_ids)
 
-    async def process_lots_with_calculator_and_db(self, lots: list[lot_pb2.Lot]):
-        unique_lots = await self.process_repeated_posts(lots)
-        lots_with_calculator = await self.get_calculators_for_lots(unique_lots)
-
-        processed_lots = await self.create_posts_batch(lots_with_calculator)
-        return processed_lots
-
-    @classmethod
-    async def serialize_response_from_assistant(cls, response: dict[str, Any]) -> dict[str, Any]:
-        if response.get('data') and response.get('data').get('response'):
-            serialized_lots_data: dict[str, Any] = ast.literal_eval(response.get('data').get('response'))
-        return serialized_lots_data
-
     @classmethod
     @log_async_execution_time('Request to ai assistant')
-    async def request_to_ai_assistant(cls, prompt: str, assistant_name: str, route: str, timeout: int = 30)-> dict[str, Any]:
-        async with RabbitMQPublisher() as publisher:
-            response = await publisher.publish_and_wait_response(route,
-                                                                 {
-                                                                     'prompt': prompt,
-                                                                     'assistant_name': assistant_name
-                                                                 },
-                                                                 timeout=timeout
-                                                                 )
-            return await cls.serialize_response_from_assistant(response)
-
-    @log_async_execution_time('Send batch request to ai assistant')
-    async def send_batch_request_to_ai_assistant(self, tasks: list[dict[str, Any]], timeout: int = 30):
-        logger.debug(f'Tasks: len {len(tasks)}, sending to ai assistant')
-        async with RabbitMQPublisher() as publisher:
-            responses = await publisher.send_multiple_rpc_requests(tasks, timeout=timeout)
-            return [await self.serialize_response_from_assistant(response) for response in responses]
-
-
-    def left_lots_by_lot_ids(self, lot_ids: list[int], lots: list[lot_pb2.Lot]) -> list[lot_pb2.Lot]:
-        left_lots = []
-        for lot in lots:
-            if lot.lot_id in lot_ids:
-                left_lots.append(lot)
-        return left_lots
-
-    def exclude_lots_by_lot_ids(self, lot_ids_to_exclude: list[int], lots: list[lot_pb2.Lot]) -> list[lot_pb2.Lot]:
-        excluded_lots = []
-        lot_ids_to_exclude_set = set(int(x) for x in lot_ids_to_exclude)
-
-        for lot in lots:
-            if int(lot.lot_id) not in lot_ids_to_exclude_set:
-                excluded_lots.append(lot)
-        return excluded_lots
-
+    async def request_to_ai_assistant(cls, prompt: str, assistant_name: str, route: str, timeout: int = 30)-> Any:
+        async def fetch() -> dict[str, Any]:
+            return await rabbit_publisher.publish_and_wait_response(route,
+                                                                    {
+                                                                        'prompt': prompt,
+                                                                        'assistant_name': assistant_name
+                                                                    },
+                                                                    timeout=timeout
+                                                                    )
+
+        return await assistant_response_cache.get_or_fetch(assistant_name, prompt, fetch, decode_assistant_response)
 
     async def send_response_to_user(self, posts: list[Post]):
         posts_serialized = []
@@ -183,76 +137,23 @@ class GeneratePost:
             'request_id': self.request_id,
             'user_uuid': self.user_uuid
         }
-        async with RabbitMQPublisher() as publisher:
-            await publisher.publish(routing_key='posts_service.generated_posts', payload=data)
-
-    async def get_average_price(self, lot: lot_pb2.Lot) -> int | None:
-        async with ApiRpcClient() as client:
-            year_from = None
-            year_to = None
-            if lot.year:
-                year_from = lot.year - 1
-                year_to = lot.year + 1
-            response = await client.get_average_price(lot.make, lot.model,
-                                                      year_from=year_from,
-                                                      year_to=year_to,
-                                                      period=6)
-
-            logger.debug(f'Response avg prices: {list(response.stats)}')
-            avg_prices = []
-            for item in response.stats:
-                avg_prices.append(item.total)
-            if not avg_prices:
-                return None
-            logger.debug(f'Avg prices: {avg_prices}')
-            avg = round(sum(avg_prices) / len(avg_prices))
-            logger.debug(f'Avg: {avg}')
-            return avg
-
+        async with get_async_db() as db:
+            await OutboxService(db).enqueue('posts_service.generated_posts', data)
 
     async def send_error_to_user(self, error_message: str):
-        async with RabbitMQPublisher() as publisher:
-            await publisher.publish(routing_key='posts_service.error', payload={
+        async with get_async_db() as db:
+            await OutboxService(db).enqueue('posts_service.error', {
                 'error_message': error_message,
                 'request_id': self.request_id,
                 'user_uuid': self.user_uuid
             })
-        pass
 
     @log_async_execution_time('Post generating')
     async def generate_post(self):
         try:
-            unique_lots = await self._fetch_unique_lots()
-            if not unique_lots:
-                return None
-
-            lots_after_ai_processing = await self._process_lots_with_ai(unique_lots)
-            if not lots_after_ai_processing:
-                await self.send_error_to_user(f'AI didnt find any suitable lots, try changing your search parameters')
-                return None
-
-            lots_with_descriptions = await self._process_lot_images(lots_after_ai_processing)
-            if not lots_with_descriptions:
-                logger.error(f'No lots with descriptions for request: {self.request_id}',
-                             extra={'request_id': self.request_id})
-                await self.send_error_to_user(f'No lots with descriptions found\n'
-                                              f'request id: {self.request_id}')
-                return None
-
-            final_lots = await self._get_final_processed_lots(lots_with_descriptions)
-            if not final_lots:
-                logger.error(f'No final lots after processing for request: {self.request_id}',
-                             extra={'request_id': self.request_id})
-                await self.send_error_to_user(f'No final lots after processing\n'
-                                              f'request id: {self.request_id}')
-                return None
-
-            lots_index = {lot.lot_id: lot for lot in lots_after_ai_processing}
-            await self._update_average_prices(final_lots, lots_index)
-            posts = await self.left_only_this_lot_ids_db(final_lots)
-            await self.send_response_to_user(posts)
-
-            return lots_with_descriptions
+            # One session for the whole run, committed after each stage so no transaction spans an AI call
+            async with UnitOfWork() as uow:
+                return await self._generate_post(uow)
         except Exception as e:
             logger.error(f'Error in generate_post for request: {self.request_id}',
                          exc_info=True, extra={'request_id': self.request_id})
@@ -260,36 +161,56 @@ class GeneratePost:
                                           f'request id: {self.request_id}')
             return None
 
+    async def _generate_post(self, uow: UnitOfWork):
+        unique_lots = await self._fetch_unique_lots()
+        await uow.commit()
+        if not unique_lots:
+            return None
+
+        lots_after_ai_processing = await self._process_lots_with_ai(unique_lots)
+        await uow.commit()
+        if not lots_after_ai_processing:
+            await self.send_error_to_user(f'AI didnt find any suitable lots, try changing your search parameters')
+            return None
+
+        lots_with_descriptions = await self._process_lot_images(lots_after_ai_processing, uow)
+        await uow.commit()
+        if not lots_with_descriptions:
+            logger.error(f'No lots with descriptions for request: {self.request_id}',
+                         extra={'request_id': self.request_id})
+            await self.send_error_to_user(f'No lots with descriptions found\n'
+                                          f'request id: {self.request_id}')
+            return None
+
+        final_lots = await self._get_final_processed_lots(lots_with_descriptions)
+        if not final_lots:
+            logger.error(f'No final lots after processing for request: {self.request_id}',
+                         extra={'request_id': self.request_id})
+            await self.send_error_to_user(f'No final lots after processing\n'
+                                          f'request id: {self.request_id}')
+            return None
+
+        lots_index = {lot.lot_id: lot for lot in lots_after_ai_processing}
+        await self._update_average_prices(final_lots, lots_index)
+        posts = await self.left_only_this_lot_ids_db(final_lots)
+        # The response is committed together with the posts it points to
+        await self.send_response_to_user(posts)
+        await uow.commit()
+
+        return posts
+
     async def _fetch_unique_lots(self):
         try:
+            lot_source = PrefetchingLotSource(self.filters)
             async with async_timer('get api results'):
-                search_results = await self._get_search_results_from_api()
-                logger.debug(f'Found {len(search_results.lot)} lots')
+                unique_lots = await lot_source.fetch()
 
-            if len(search_results.lot) == 0:
+            if lot_source.found_count == 0:
                 logger.error(f'No lots found for request: {self.request_id}', extra={'request_id': self.request_id})
                 await self.send_error_to_user(f'No lots found, change filters\n'
                                               f'request id: {self.request_id}')
                 return None
 
-            all_lots = list(search_results.lot)
-            unique_lots = await self.process_repeated_posts(all_lots)
-
-            current_page = search_results.pagination.page
-            while len(unique_lots) < 14 and search_results.pagination.pages > current_page + 1:
-                current_page += 1
-                try:
-                    async with async_timer(f'get api results for page {current_page}'):
-                        search_results_next_page = await self._get_search_results_from_api(page=current_page)
-                        logger.debug(f'Found {len(search_results_next_page.lot)} lots on page {current_page}')
-
-                        unique_lots = await self.process_repeated_posts(list(search_results_next_page.lot))
-                        search_results = search_results_next_page
-                except Exception as e:
-                    logger.error(f'Error fetching page {current_page} for request: {self.request_id}',
-                                 exc_info=True, extra={'request_id': self.request_id})
-                    break
-
             if not unique_lots:
                 logger.error(f'No unique lots remain for request: {self.request_id}',
                              extra={'request_id': self.request_id})
@@ -311,29 +232,43 @@ class GeneratePost:
             serialized_lots = Transformers.transform_lot_for_ai(unique_lots)
 
             async with async_timer('get calculator and process lots with ai chooser'):
-                calculator_task = self.get_calculators_for_lots(unique_lots)
-                ai_chooser_task = self.request_to_ai_assistant(
-                    serialized_lots,
-                    'lot_chooser',
-                    'post_generator.generate_response.text',
-                    timeout=120
-                )
-
-                responses = await asyncio.gather(calculator_task, ai_chooser_task)
-
-            lots_with_calculator = responses[0]
-            lots_from_calculator = [lot.lot_id for lot, calculator in lots_with_calculator]
-            await self.create_posts_batch(lots_with_calculator)
-
-            response_from_ai_chooser = responses[1]
-            lots_from_ai_chooser = response_from_ai_chooser.get('lots')
-            lot_ids = [lot.get('lot_id') for lot in lots_from_ai_chooser]
-
-            await self.left_only_this_lot_ids_db(lot_ids)
-            lots_with_calculator = self.left_lots_by_lot_ids(lots_from_calculator, unique_lots)
-            logger.debug(f'Lots with calculator: {len(lots_with_calculator)}')
-
-            return self.left_lots_by_lot_ids(lot_ids, lots_with_calculator)
+                # Calculators start speculatively next to the chooser; only the chosen lots' ones are awaited
+                calculator_tasks = {
+                    lot.lot_id: asyncio.create_task(self.get_calculator_for_lot(lot)) for lot in unique_lots
+                }
+                try:
+                    response_from_ai_chooser = await self.request_to_ai_assistant(
+                        serialized_lots,
+                        'lot_chooser',
+                        'post_generator.generate_response.text',
+                        timeout=120
+                    )
+                    lot_ids = {lot.lot_id for lot in response_from_ai_chooser.lots}
+                    chosen_lots = [lot for lot in unique_lots if lot.lot_id in lot_ids]
+
+                    discarded = [task for lot_id, task in calculator_tasks.items() if lot_id not in lot_ids]
+                    for task in discarded:
+                        task.cancel()
+                    metrics.inc('calculator.speculative_discarded', len(discarded))
+
+                    calculators = await asyncio.gather(
+                        *(calculator_tasks[lot.lot_id] for lot in chosen_lots),
+                        return_exceptions=True
+                    )
+                finally:
+                    for task in calculator_tasks.values():
+                        task.cancel()
+                    await asyncio.gather(*calculator_tasks.values(), return_exceptions=True)
+
+            lots_with_calculator = []
+            for lot, calculator in zip(chosen_lots, calculators):
+                if isinstance(calculator, Exception):
+                    logger.error(f"Error getting calculator for lot {lot.lot_id}: {calculator}")
+                elif calculator:
+                    lots_with_calculator.append((lot, calculator))
+            logger.debug(f'Chosen lots with calculator: {len(lots_with_calculator)} of {len(chosen_lots)}')
+
+            return await self.create_posts_batch(lots_with_calculator)
         except Exception as e:
             logger.error(f'Error in _process_lots_with_ai for request: {self.request_id}',
                          exc_info=True, extra={'request_id': self.request_id})
@@ -341,34 +276,70 @@ class GeneratePost:
                                           f'request id: {self.request_id}')
             return None
 
-    async def _process_lot_images(self, lots_after_ai_chooser):
+    async def _analyse_lot_images(self, lot: lot_pb2.Lot) -> LotImagesResponse:
+        response = await rabbit_publisher.send_rpc_request(
+            'ai_chat_bot_service',
+            'post_generator.generate_response.image',
+            {
+                "image_urls": ImageAnalysisService.image_urls(lot),
+                'assistant_name': 'lot_images_processor',
+                'lot_id': lot.lot_id
+            },
+            timeout=settings.IMAGE_ANALYSIS_RPC_TIMEOUT_SECONDS
+        )
+        analysis = await decode_assistant_response('lot_images_processor', response)
+        if analysis.lot_id != lot.lot_id:
+            analysis = analysis.model_copy(update={'lot_id': lot.lot_id})
+        return analysis
+
+    async def _process_lot_images(self, lots_after_ai_chooser, uow: UnitOfWork):
         try:
             async with async_timer('get image description'):
-                tasks = []
-                for lot in lots_after_ai_chooser:
-                    tasks.append({
-                        'service_queue': 'ai_chat_bot_service',
-                        'action': 'post_generator.generate_response.image',
-                        'data': {
-                            "image_urls": list(lot.link_img_hd)[:7],
-                            'assistant_name': 'lot_images_processor',
-                            'lot_id': lot.lot_id
-                        }
-                    })
+                cached_analyses = await ImageAnalysisService.get_cached(lots_after_ai_chooser)
+                # Ends the lookup's transaction so it stays closed through the analysis RPCs
+                await uow.commit()
 
-                image_description_responses = await self.send_batch_request_to_ai_assistant(tasks, timeout=240)
+                async def analyse_images(lot: lot_pb2.Lot) -> dict[str, Any]:
+                    analysis = cached_analyses.get(lot.lot_id) or await self._analyse_lot_images(lot)
+                    return {"lot": lot, "analysis": analysis}
 
-            lots_index = {lot.lot_id: lot for lot in lots_after_ai_chooser}
+                async def prefetch_average_price(item: dict[str, Any]) -> dict[str, Any]:
+                    # Warms the average price cache; _update_average_prices reads it later
+                    try:
+                        await AveragePriceService.get_for_lot(item["lot"])
+                    except Exception as e:
+                        logger.warning(f'Average price prefetch failed for lot {item["lot"].lot_id}: {e}',
+                                       extra={'request_id': self.request_id})
+                    return item
+
+                pipeline = StreamingPipeline('lot_images', [
+                    Stage(name='image_analysis', handler=analyse_images,
+                          concurrency=settings.IMAGE_ANALYSIS_CONCURRENCY),
+                    Stage(name='average_price', handler=prefetch_average_price,
+                          concurrency=settings.AVERAGE_PRICE_CONCURRENCY),
+                ])
+                analysed = await pipeline.run(lots_after_ai_chooser,
+                                              cutoff=settings.IMAGE_ANALYSIS_STRAGGLER_CUTOFF_SECONDS)
+                if pipeline.stragglers:
+                    metrics.inc('image_analysis.stragglers', len(pipeline.stragglers))
+                    logger.warning(f'Dropped {len(pipeline.stragglers)} lots still analysing at the cutoff',
+                                   extra={'request_id': self.request_id,
+                                          'lot_ids': [lot.lot_id for lot in pipeline.stragglers]})
+
+                # Cached analyses are written too, so this request's posts carry them
+                await ImageAnalysisService.store(self.request_id, lots_after_ai_chooser,
+                                                 [item["analysis"] for item in analysed])
+
+            analysed_index = {item["lot"].lot_id: item["analysis"] for item in analysed}
             lots_with_image_description = []
 
-            for response in image_description_responses:
-                lot_id = response.get('lot_id')
-                if lot_id and lot_id in lots_index:
-                    lot_obj = lots_index[lot_id]
+            for lot in lots_after_ai_chooser:
+                analysis = analysed_index.get(lot.lot_id)
+                if analysis is not None:
                     lots_with_image_description.append({
-                        "lot": lot_obj,
-                        "description": response.get('description', ''),
-                        "score": response.get('condition_score', 0)
+                        "lot": lot,
+                        "description": analysis.description,
+                        "score": analysis.condition_score
                     })
 
             return lots_with_image_description
@@ -392,7 +363,7 @@ class GeneratePost:
                     timeout=90
                 )
 
-            return [lot.get('lot_id') for lot in full_lot_processor_response.get('lots', []) if lot]
+            return [lot.lot_id for lot in full_lot_processor_response.lots]
         except Exception as e:
             logger.error(f'Error in _get_final_processed_lots for request: {self.request_id}',
                          exc_info=True, extra={'request_id': self.request_id})
@@ -403,19 +374,20 @@ class GeneratePost:
     async def _update_average_prices(self, final_lot_ids, lots_index):
         try:
             async with async_timer('update average sell price'):
+                lots = []
                 for lot_id in final_lot_ids:
-                    try:
-                        lot = lots_index[lot_id]
-                        average_price = await self.get_average_price(lot)
-
-                        async with get_async_db() as db:
-                            posts_service = PostService(db)
-                            post = await posts_service.get_by_lot_id(lot_id)
-                            await posts_service.update(post.id, PostUpdate(average_sell_price=average_price))
-                    except Exception as e:
-                        logger.error(f'Error updating average price for lot {lot_id}, request: {self.request_id}',
-                                     exc_info=True, extra={'request_id': self.request_id, 'lot_id': lot_id})
-                        continue
+                    if lot_id in lots_index:
+                        lots.append(lots_index[lot_id])
+                    else:
+                        logger.error(f'Final lot {lot_id} is not among processed lots, request: {self.request_id}',
+                                     extra={'request_id': self.request_id, 'lot_id': lot_id})
+
+                average_prices = await AveragePriceService.get_for_lots(lots)
+                found_prices = {lot_id: price for lot_id, price in average_prices.items() if price is not None}
+
+                async with get_async_db() as db:
+                    posts_service = PostService(db)
+                    await posts_service.bulk_update_average_prices(self.request_id, found_prices)
         except Exception as e:
             logger.error(f'Error in _update_average_prices for request: {self.request_id}',
                          exc_info=True, extra={'request_id': self.request_id})
@@ -0,0 +1,85 @@
+import hashlib
+from typing import Iterable
+
+from app.config import settings
+from app.core.cache import AsyncTTLCache
+from app.core.logger import logger
+from app.database.crud.post import PostService
+from app.database.db.session import get_async_db
+from app.rpc_client.gen.python.auction.v1 import lot_pb2
+from app.services.ai_post_generation.assistant_responses import LotImagesResponse
+
+# (lot_id, hash of the analysed image urls)
+ImageAnalysisKey = tuple[int, str]
+
+image_analysis_cache: AsyncTTLCache[ImageAnalysisKey, LotImagesResponse] = AsyncTTLCache(
+    'image_analysis',
+    max_size=settings.IMAGE_ANALYSIS_CACHE_MAX_SIZE,
+    ttl=settings.IMAGE_ANALYSIS_CACHE_TTL_SECONDS
+)
+
+
+class ImageAnalysisService:
+    images_count: int = 7
+
+    @classmethod
+    def image_urls(cls, lot: lot_pb2.Lot) -> list[str]:
+        return list(lot.link_img_hd)[:cls.images_count]
+
+    @classmethod
+    def images_hash(cls, urls: Iterable[str]) -> str:
+        return hashlib.sha256('\n'.join(urls).encode()).hexdigest()
+
+    @classmethod
+    def key_for_lot(cls, lot: lot_pb2.Lot) -> ImageAnalysisKey:
+        return lot.lot_id, cls.images_hash(cls.image_urls(lot))
+
+    @classmethod
+    async def get_cached(cls, lots: list[lot_pb2.Lot]) -> dict[int, LotImagesResponse]:
+        """Known analyses per lot id, from memory first and then from stored posts with the same photos."""
+        found = {}
+        missing = {}
+        for lot in lots:
+            key = cls.key_for_lot(lot)
+            cached = image_analysis_cache.get(key)
+            if cached is not None:
+                found[lot.lot_id] = cached
+            else:
+                missing[lot.lot_id] = key
+
+        if not missing:
+            return found
+
+        async with get_async_db() as db:
+            posts = await PostService(db).get_with_image_analysis(list(missing))
+
+        for post in posts:
+            key = missing.get(post.lot_id)
+            if key is None or post.lot_id in found:
+                continue
+            # Posts keep up to 10 urls; the analysis only saw the first images_count
+            if cls.images_hash(post.images.split(',')[:cls.images_count]) != key[1]:
+                continue
+            analysis = LotImagesResponse(lot_id=post.lot_id,
+                                         description=post.image_description,
+                                         condition_score=post.image_score)
+            image_analysis_cache.set(key, analysis)
+            found[post.lot_id] = analysis
+
+        logger.debug(f'Image analysis cache: {len(found)} of {len(lots)} lots found')
+        return found
+
+    @classmethod
+    async def store(cls, request_id: int, lots: list[lot_pb2.Lot], analyses: list[LotImagesResponse]):
+        lots_index = {lot.lot_id: lot for lot in lots}
+        stored = {}
+        for analysis in analyses:
+            lot = lots_index.get(analysis.lot_id)
+            if lot is None:
+                continue
+            image_analysis_cache.set(cls.key_for_lot(lot), analysis)
+            stored[analysis.lot_id] = analysis
+
+        if stored:
+            async with get_async_db() as db:
+                await PostService(db).bulk_update_image_analysis(request_id, stored)
@@ -0,0 +1,101 @@
+import asyncio
+
+from app.config import settings
+from app.core.logger import logger
+from app.database.crud.post import PostService
+from app.database.db.session import get_async_db
+from app.rpc_client.auction_api import ApiRpcClient
+from app.rpc_client.gen.python.auction.v1 import lot_pb2
+from app.services.ai_post_generation.types import Filters
+
+
+class PrefetchingLotSource:
+    """
+    Collects lots that have no post yet from the auction API search.
+
+    Pages after the first are requested ``prefetch_pages`` at a time and deduplicated
+    against the DB as they arrive. Survivors are accumulated in page order until
+    ``target_count`` is reached; page requests still in flight are then cancelled.
+    """
+
+    def __init__(
+            self,
+            filters: Filters,
+            target_count: int = settings.LOTS_TARGET_COUNT,
+            page_size: int = settings.LOTS_PAGE_SIZE,
+            prefetch_pages: int = settings.LOTS_PREFETCH_PAGES,
+            max_pages: int = settings.LOTS_MAX_PAGES
+    ):
+        self.filters = filters
+        self.target_count = target_count
+        self.page_size = page_size
+        self.prefetch_pages = max(1, prefetch_pages)
+        self.max_pages = max_pages
+        self.found_count = 0
+
+    async def _get_page(self, page: int) -> lot_pb2.GetCurrentLotsByFiltersResponse:
+        async with ApiRpcClient() as client:
+            return await client.get_current_lots_with_filters(self.filters, size=self.page_size, page=page)
+
+    @classmethod
+    async def _exclude_repeated(cls, lots: list[lot_pb2.Lot]) -> list[lot_pb2.Lot]:
+        if not lots:
+            return []
+        async with get_async_db() as db:
+            repeated_lot_ids = await PostService(db).get_repeated_lot_ids([lot.lot_id for lot in lots])
+        return [lot for lot in lots if lot.lot_id not in repeated_lot_ids]
+
+    async def _get_unique_page(self, page: int) -> list[lot_pb2.Lot]:
+        response = await self._get_page(page)
+        logger.debug(f'Found {len(response.lot)} lots on page {page}')
+        self.found_count += len(response.lot)
+        return await self._exclude_repeated(list(response.lot))
+
+    def _accumulate(self, unique_lots: list[lot_pb2.Lot], seen: set[int], lots: list[lot_pb2.Lot]):
+        for lot in lots:
+            if lot.lot_id not in seen:
+                seen.add(lot.lot_id)
+                unique_lots.append(lot)
+
+    async def fetch(self) -> list[lot_pb2.Lot]:
+        first_page = await self._get_page(1)
+        logger.debug(f'Found {len(first_page.lot)} lots')
+        self.found_count = len(first_page.lot)
+
+        unique_lots: list[lot_pb2.Lot] = []
+        seen: set[int] = set()
+        self._accumulate(unique_lots, seen, await self._exclude_repeated(list(first_page.lot)))
+
+        last_page = min(first_page.pagination.pages, self.max_pages)
+        next_page = 2
+        pending: dict[asyncio.Task, int] = {}
+        # Pages finished out of order wait here until the pages before them are in
+        finished: dict[int, list[lot_pb2.Lot]] = {}
+        next_to_accumulate = 2
+
+        try:
+            while len(unique_lots) < self.target_count and (pending or next_page <= last_page):
+                while len(pending) < self.prefetch_pages and next_page <= last_page:
+                    pending[asyncio.create_task(self._get_unique_page(next_page))] = next_page
+                    next_page += 1
+
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    page = pending.pop(task)
+                    try:
+                        finished[page] = task.result()
+                    except Exception as e:
+                        logger.error(f'Error fetching page {page}: {e}', extra={'page': page})
+                        finished[page] = []
+
+                while next_to_accumulate in finished and len(unique_lots) < self.target_count:
+                    self._accumulate(unique_lots, seen, finished.pop(next_to_accumulate))
+                    next_to_accumulate += 1
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        logger.debug(f'Unique lots: {len(unique_lots)} after {next_to_accumulate - 1} of {last_page} pages')
+        return unique_lots[:self.target_count]
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Iterable
+
+from pydantic import BaseModel
+
+from app.core.logger import logger
+from app.core.metrics import metrics
+
+
+class Stage(BaseModel):
+    """One pipeline step; returning ``None`` from ``handler`` drops the item."""
+    name: str
+    handler: Callable[[Any], Awaitable[Any | None]]
+    concurrency: int = 1
+
+
+class StreamingPipeline:
+    """
+    Pushes items through stages connected by queues.
+
+    Every stage runs ``concurrency`` workers, so an item moves on as soon as its
+    own step is done instead of waiting for the rest of its batch. With a
+    ``cutoff`` the run stops that many seconds after it started and returns what
+    has made it through; the input items that had not finished are dropped and
+    kept in ``stragglers``.
+    """
+
+    def __init__(self, name: str, stages: list[Stage]):
+        self.name = name
+        self.stages = stages
+        self.stragglers: list[Any] = []
+
+    async def run(self, items: Iterable[Any], cutoff: float | None = None) -> list[Any]:
+        queues = [asyncio.Queue() for _ in self.stages]
+        results: list[Any] = []
+        # Input items by position, until they leave the pipeline one way or the other
+        pending: dict[int, Any] = {}
+        drained = asyncio.Event()
+        self.stragglers = []
+
+        def finish_item(position: int):
+            pending.pop(position, None)
+            if not pending:
+                drained.set()
+
+        async def worker(index: int, stage: Stage):
+            queue = queues[index]
+            while True:
+                position, item = await queue.get()
+                try:
+                    started = time.perf_counter()
+                    result = await stage.handler(item)
+                    metrics.inc('pipeline.stage.seconds', time.perf_counter() - started,
+                                pipeline=self.name, stage=stage.name)
+                except Exception as e:
+                    logger.error(f'Pipeline {self.name} stage {stage.name} failed: {e}',
+                                 extra={'pipeline': self.name, 'stage': stage.name})
+                    result = None
+
+                if result is None:
+                    metrics.inc('pipeline.dropped', pipeline=self.name, stage=stage.name)
+                    finish_item(position)
+                elif index + 1 < len(queues):
+                    queues[index + 1].put_nowait((position, result))
+                else:
+                    results.append(result)
+                    finish_item(position)
+
+        for position, item in enumerate(items):
+            pending[position] = item
+            queues[0].put_nowait((position, item))
+        if not pending:
+            return results
+
+        workers = [
+            asyncio.create_task(worker(index, stage))
+            for index, stage in enumerate(self.stages)
+            for _ in range(max(1, stage.concurrency))
+        ]
+        try:
+            await asyncio.wait_for(drained.wait(), timeout=cutoff)
+        except TimeoutError:
+            self.stragglers = list(pending.values())
+            metrics.inc('pipeline.stragglers', len(self.stragglers), pipeline=self.name)
+            logger.warning(f'Pipeline {self.name} cut off after {cutoff}s, dropping {len(self.stragglers)} stragglers',
+                           extra={'pipeline': self.name, 'stragglers': len(self.stragglers)})
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        return results
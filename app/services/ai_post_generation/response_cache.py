@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Protocol
+
+from app.config import settings
+from app.core.cache import AsyncTTLCache
+from app.core.logger import logger
+from app.core.metrics import metrics
+from app.services.ai_post_generation.assistant_responses import AssistantResponseError
+
+# (assistant_name, sha256 of the prompt)
+ResponseKey = tuple[str, str]
+
+
+class ResponseStore(Protocol):
+    """Second cache tier holding raw assistant replies, shared across restarts."""
+
+    async def get(self, key: ResponseKey) -> dict[str, Any] | None: ...
+
+    async def set(self, key: ResponseKey, response: dict[str, Any]) -> None: ...
+
+    async def clear(self) -> None: ...
+
+    async def close(self) -> None: ...
+
+    def stats(self) -> dict[str, float]: ...
+
+
+class SqliteResponseStore:
+    """
+    Assistant replies in a local SQLite file.
+
+    sqlite3 is blocking, so every call runs in a worker thread over one shared connection.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS assistant_response ('
+                'assistant_name TEXT NOT NULL, '
+                'prompt_hash TEXT NOT NULL, '
+                'response TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, '
+                'accessed_at REAL NOT NULL, '
+                'PRIMARY KEY (assistant_name, prompt_hash))'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_assistant_response_accessed_at ON assistant_response (accessed_at)'
+            )
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _get(self, key: ResponseKey) -> str | None:
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                'SELECT response, expires_at FROM assistant_response WHERE assistant_name = ? AND prompt_hash = ?',
+                key
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                connection.execute('DELETE FROM assistant_response WHERE assistant_name = ? AND prompt_hash = ?', key)
+                connection.commit()
+                return None
+            connection.execute(
+                'UPDATE assistant_response SET accessed_at = ? WHERE assistant_name = ? AND prompt_hash = ?',
+                (now, *key)
+            )
+            connection.commit()
+            return row[0]
+
+    def _set(self, key: ResponseKey, response: str):
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                'INSERT OR REPLACE INTO assistant_response '
+                '(assistant_name, prompt_hash, response, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (*key, response, now + self.ttl, now)
+            )
+            connection.execute('DELETE FROM assistant_response WHERE expires_at <= ?', (now,))
+            evicted = connection.execute(
+                'DELETE FROM assistant_response WHERE rowid IN ('
+                'SELECT rowid FROM assistant_response ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            ).rowcount
+            connection.commit()
+        if evicted > 0:
+            metrics.inc('cache.evictions', evicted, cache='assistant_response.sqlite')
+
+    def _clear(self):
+        with self._lock:
+            connection = self._connect()
+            connection.execute('DELETE FROM assistant_response')
+            connection.commit()
+
+    def _close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    async def get(self, key: ResponseKey) -> dict[str, Any] | None:
+        raw = await asyncio.to_thread(self._get, key)
+        if raw is None:
+            metrics.inc('cache.misses', cache='assistant_response.sqlite')
+            return None
+        metrics.inc('cache.hits', cache='assistant_response.sqlite')
+        return json.loads(raw)
+
+    async def set(self, key: ResponseKey, response: dict[str, Any]) -> None:
+        await asyncio.to_thread(self._set, key, json.dumps(response, default=str))
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._clear)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            'hits': metrics.get('cache.hits', cache='assistant_response.sqlite'),
+            'misses': metrics.get('cache.misses', cache='assistant_response.sqlite'),
+            'evictions': metrics.get('cache.evictions', cache='assistant_response.sqlite'),
+        }
+
+
+class AssistantResponseCache:
+    """
+    Decoded assistant replies keyed by ``(assistant_name, sha256(prompt))``.
+
+    The in-memory tier holds decoded models and coalesces identical in-flight prompts;
+    the optional store keeps the raw replies. Replies that fail to decode are never cached.
+    """
+
+    def __init__(self, memory: AsyncTTLCache[ResponseKey, Any], store: ResponseStore | None = None,
+                 assistants: list[str] | None = None):
+        self.memory = memory
+        self.store = store
+        self.assistants = assistants
+
+    @staticmethod
+    def key_for(assistant_name: str, prompt: str) -> ResponseKey:
+        return assistant_name, hashlib.sha256(prompt.encode()).hexdigest()
+
+    def is_cacheable(self, assistant_name: str) -> bool:
+        return self.assistants is None or assistant_name in self.assistants
+
+    async def get_or_fetch(
+            self,
+            assistant_name: str,
+            prompt: str,
+            fetch: Callable[[], Awaitable[dict[str, Any]]],
+            decode: Callable[[str, dict[str, Any]], Awaitable[Any]]
+    ) -> Any:
+        if not self.is_cacheable(assistant_name):
+            return await decode(assistant_name, await fetch())
+
+        key = self.key_for(assistant_name, prompt)
+
+        async def load() -> Any:
+            if self.store is not None:
+                stored = await self._store_get(key)
+                if stored is not None:
+                    try:
+                        return await decode(assistant_name, stored)
+                    except AssistantResponseError:
+                        logger.warning(f'Dropping undecodable cached response of {assistant_name}')
+
+            response = await fetch()
+            decoded = await decode(assistant_name, response)
+            if self.store is not None:
+                await self._store_set(key, response)
+            return decoded
+
+        return await self.memory.get_or_load(key, load)
+
+    async def _store_get(self, key: ResponseKey) -> dict[str, Any] | None:
+        try:
+            return await self.store.get(key)
+        except Exception as e:
+            logger.error(f'Error reading assistant response cache: {e}')
+            return None
+
+    async def _store_set(self, key: ResponseKey, response: dict[str, Any]):
+        try:
+            await self.store.set(key, response)
+        except Exception as e:
+            logger.error(f'Error writing assistant response cache: {e}')
+
+    async def clear(self):
+        self.memory.clear()
+        if self.store is not None:
+            await self.store.clear()
+
+    async def close(self):
+        if self.store is not None:
+            await self.store.close()
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        stats = {'memory': self.memory.stats()}
+        if self.store is not None:
+            stats['store'] = self.store.stats()
+        return stats
+
+
+assistant_response_cache = AssistantResponseCache(
+    AsyncTTLCache('assistant_response',
+                  max_size=settings.LLM_CACHE_MAX_SIZE,
+                  ttl=settings.LLM_CACHE_TTL_SECONDS),
+    store=SqliteResponseStore(settings.LLM_CACHE_SQLITE_PATH,
+                              ttl=settings.LLM_CACHE_TTL_SECONDS,
+                              max_entries=settings.LLM_CACHE_SQLITE_MAX_ENTRIES)
+    if settings.LLM_CACHE_SQLITE_PATH else None,
+    assistants=settings.LLM_CACHE_ASSISTANTS
+)
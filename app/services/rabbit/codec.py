@@ -0,0 +1,188 @@
+import gzip
+import json
+from abc import ABC, abstractmethod
+from typing import Any
+
+from aio_pika.abc import AbstractMessage
+
+from app.config import settings
+from app.core.logger import logger
+
+# Fast codecs are project dependencies; the stdlib fallback only covers stripped-down installs
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+class Codec(ABC):
+    content_type: str
+
+    @abstractmethod
+    def encode(self, obj: Any) -> bytes:
+        ...
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        ...
+
+
+class JsonCodec(Codec):
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(Codec):
+    """Same wire format as JsonCodec, several times faster on large payloads."""
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def decode(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def encode(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+class Compressor(ABC):
+    encoding: str
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        ...
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        ...
+
+
+class GzipCompressor(Compressor):
+    encoding = "gzip"
+
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, compresslevel=5)
+
+    def decompress(self, data: bytes) -> bytes:
+        return gzip.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    encoding = "zstd"
+
+    def __init__(self, level: int = 3):
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        # Frames written by compress() carry their content size
+        return self._decompressor.decompress(data)
+
+
+def available_codecs() -> dict[str, Codec]:
+    codecs: dict[str, Codec] = {"json": JsonCodec()}
+    if orjson is not None:
+        codecs["orjson"] = OrjsonCodec()
+    if msgpack is not None:
+        codecs["msgpack"] = MsgpackCodec()
+    return codecs
+
+
+def available_compressors() -> dict[str, Compressor]:
+    compressors: dict[str, Compressor] = {"gzip": GzipCompressor()}
+    if zstandard is not None:
+        compressors["zstd"] = ZstdCompressor()
+    return compressors
+
+
+class MessageCodec:
+    """
+    Encodes outgoing bodies with the configured codec and decodes incoming ones
+    according to their ``content_type``/``content_encoding``.
+
+    Peers that only speak JSON keep working with the defaults: ``orjson`` writes
+    plain ``application/json``, and compression is off unless configured.
+    """
+
+    def __init__(
+            self,
+            codec: str = settings.RABBITMQ_CODEC,
+            compression: str | None = settings.RABBITMQ_COMPRESSION,
+            compression_min_bytes: int = settings.RABBITMQ_COMPRESSION_MIN_BYTES
+    ):
+        codecs = available_codecs()
+        compressors = available_compressors()
+
+        if codec not in codecs:
+            fallback = "orjson" if "orjson" in codecs else "json"
+            logger.warning(f"Message codec '{codec}' is not available, falling back to {fallback}")
+            codec = fallback
+        if compression and compression not in compressors:
+            logger.warning(f"Message compression '{compression}' is not available, disabled")
+            compression = None
+
+        self.codec = codecs[codec]
+        self.compressor = compressors[compression] if compression else None
+        self.compression_min_bytes = compression_min_bytes
+
+        # Decoding picks the fastest implementation for each content type
+        self._decoders: dict[str, Codec] = {JSON_CONTENT_TYPE: codecs.get("orjson", codecs["json"])}
+        if "msgpack" in codecs:
+            self._decoders[MSGPACK_CONTENT_TYPE] = codecs["msgpack"]
+        self._decompressors = compressors
+
+    def encode(self, obj: Any) -> tuple[bytes, str, str | None]:
+        """Returns ``(body, content_type, content_encoding)``."""
+        body = self.codec.encode(obj)
+        if self.compressor is not None and len(body) >= self.compression_min_bytes:
+            return self.compressor.compress(body), self.codec.content_type, self.compressor.encoding
+        return body, self.codec.content_type, None
+
+    def decode(self, body: bytes, content_type: str | None = None, content_encoding: str | None = None) -> Any:
+        if content_encoding:
+            decompressor = self._decompressors.get(content_encoding)
+            if decompressor is None:
+                raise ValueError(f"Unsupported content encoding: {content_encoding}")
+            body = decompressor.decompress(body)
+
+        decoder = self._decoders.get(content_type or JSON_CONTENT_TYPE)
+        if decoder is None:
+            # Unknown or missing content type: every peer in the system speaks JSON
+            decoder = self._decoders[JSON_CONTENT_TYPE]
+        return decoder.decode(body)
+
+    def decode_message(self, message: AbstractMessage) -> Any:
+        return self.decode(message.body, message.content_type, message.content_encoding)
+
+
+message_codec = MessageCodec()
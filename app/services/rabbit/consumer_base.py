@@ -1,42 +1,142 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from aio_pika import ExchangeType
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, List, Optional, AsyncIterator
+from aio_pika import ExchangeType, Message, DeliveryMode
 from aio_pika.abc import AbstractRobustConnection, AbstractRobustExchange, AbstractRobustQueue, \
-    AbstractIncomingMessage, ConsumerTag
+    AbstractIncomingMessage, ConsumerTag, AbstractRobustChannel
 
 from app.config import settings
 from app.core.logger import logger
+from app.core.metrics import metrics
+from app.services.rabbit.codec import message_codec
+from app.services.rabbit.types import QueueLane
+
+
+class WorkerSlots:
+    """
+    Bounded concurrency for message handlers.
+
+    ``size`` pipelines may run at once; ``routing_key_limits`` additionally caps
+    individual routing keys so one kind of slow work cannot take every slot.
+    """
+
+    def __init__(self, name: str, size: int, routing_key_limits: Optional[dict[str, int]] = None):
+        self.name = name
+        self.size = size
+        self.routing_key_limits = routing_key_limits or {}
+        self._slots = asyncio.Semaphore(size)
+        self._key_slots = {key: asyncio.Semaphore(limit) for key, limit in self.routing_key_limits.items()}
+        self.in_flight = 0
+        self.in_flight_by_key: dict[str, int] = defaultdict(int)
+
+    @asynccontextmanager
+    async def acquire(self, routing_key: str) -> AsyncIterator[None]:
+        # The routing-key slot is taken first so a saturated key does not hold a shared slot
+        key_slot = self._key_slots.get(routing_key)
+        if key_slot is not None:
+            await key_slot.acquire()
+        try:
+            async with self._slots:
+                self._track(routing_key, 1)
+                try:
+                    yield
+                finally:
+                    self._track(routing_key, -1)
+        finally:
+            if key_slot is not None:
+                key_slot.release()
+
+    def _track(self, routing_key: str, delta: int):
+        self.in_flight += delta
+        self.in_flight_by_key[routing_key] += delta
+        metrics.set_gauge('rabbit.consumer.in_flight', self.in_flight, queue=self.name)
+        metrics.set_gauge('rabbit.consumer.in_flight', self.in_flight_by_key[routing_key],
+                          queue=self.name, routing_key=routing_key)
+
+
+RETRY_COUNT_HEADER = 'x-retry-count'
+ORIGINAL_ROUTING_KEY_HEADER = 'x-original-routing-key'
+LAST_ERROR_HEADER = 'x-last-error'
+
+
+def retry_delay_ms(attempt: int) -> int:
+    delay = settings.RABBITMQ_RETRY_BASE_DELAY_MS * settings.RABBITMQ_RETRY_BACKOFF_MULTIPLIER ** (attempt - 1)
+    return int(min(delay, settings.RABBITMQ_RETRY_MAX_DELAY_MS))
+
+
+class _ConsumerLane:
+    """Runtime state of one queue lane: its channel, queue, consumer and worker slots."""
+
+    def __init__(self, config: QueueLane):
+        self.config = config
+        self.name = config.queue_name
+        self.prefetch_count = config.prefetch_count or config.worker_slots * settings.RABBITMQ_PREFETCH_PER_SLOT
+        self.slots = WorkerSlots(config.queue_name, config.worker_slots, config.routing_key_limits)
+        self.channel: Optional[AbstractRobustChannel] = None
+        self.queue: Optional[AbstractRobustQueue] = None
+        self.consumer_tag: Optional[ConsumerTag] = None
+        self.queue_depth_task: Optional[asyncio.Task] = None
+
+    def retry_queue_name(self, attempt: int) -> str:
+        # The delay is part of the name: a queue's TTL cannot change once declared
+        return f'{self.name}.retry.{retry_delay_ms(attempt)}'
+
+    @property
+    def parking_queue_name(self) -> str:
+        return f'{self.name}.parking'
 
 
 class RabbitBaseService(ABC):
     def __init__(self, connection: AbstractRobustConnection,
                  routing_keys: List[str],
                  exchange_name: str = settings.RABBITMQ_EXCHANGE_NAME,
-                 prefetch_count: int = 10,
+                 prefetch_count: Optional[int] = None,
                  durable: bool = True,
                  queue_name: str = settings.RABBITMQ_QUEUE_NAME,
-                 max_retries: int = 3):
+                 max_retries: int = 3,
+                 worker_slots: int = settings.RABBITMQ_WORKER_SLOTS,
+                 routing_key_limits: Optional[dict[str, int]] = None,
+                 lanes: Optional[List[QueueLane]] = None):
 
         self.queue_name = queue_name
         self.connection = connection
         self.exchange_name = exchange_name
-        self.prefetch_count = prefetch_count
         self.durable = durable
         self.routing_keys = routing_keys
         self.max_retries = max_retries
 
+        # Without explicit lanes everything goes through one queue, as before
+        if not lanes:
+            lanes = [QueueLane(
+                queue_name=queue_name,
+                routing_keys=routing_keys,
+                worker_slots=worker_slots,
+                prefetch_count=prefetch_count,
+                routing_key_limits=routing_key_limits if routing_key_limits is not None
+                else settings.RABBITMQ_ROUTING_KEY_LIMITS
+            )]
+        self.lanes = [_ConsumerLane(lane) for lane in lanes]
 
         self.exchange: Optional[AbstractRobustExchange] = None
-        self.queue: Optional[AbstractRobustQueue] = None
-        self.consumer_tag: Optional[ConsumerTag] = None
+        self._tasks: set[asyncio.Task] = set()
 
         logger.info(
             "RabbitService initialized",
             extra={
-                "queue_name": self.queue_name,
                 "exchange_name": self.exchange_name,
-                "routing_keys": self.routing_keys,
-                "prefetch_count": self.prefetch_count,
+                "lanes": [
+                    {
+                        "queue_name": lane.name,
+                        "routing_keys": lane.config.routing_keys,
+                        "prefetch_count": lane.prefetch_count,
+                        "worker_slots": lane.slots.size,
+                        "routing_key_limits": lane.slots.routing_key_limits
+                    }
+                    for lane in self.lanes
+                ],
                 "max_retries": self.max_retries
             }
         )
@@ -47,50 +147,18 @@ class RabbitBaseService(ABC):
                 "Setting up RabbitMQ connection",
                 extra={
                     "exchange_name": self.exchange_name,
-                    "queue_name": self.queue_name
+                    "queues": [lane.name for lane in self.lanes]
                 }
             )
 
-            channel = await self.connection.channel()
-            await channel.set_qos(prefetch_count=self.prefetch_count)
-
-            self.exchange = await channel.declare_exchange(
-                self.exchange_name,
-                ExchangeType.TOPIC,
-                durable=self.durable
-            )
-
-            logger.debug(
-                "Exchange declared successfully",
-                extra={"exchange_name": self.exchange_name}
-            )
-
-            self.queue = await channel.declare_queue(
-                self.queue_name,
-                durable=self.durable
-            )
-
-            logger.debug(
-                "Queue declared successfully",
-                extra={"queue_name": self.queue_name}
-            )
-
-            for routing_key in self.routing_keys:
-                await self.queue.bind(self.exchange, routing_key=routing_key)
-                logger.debug(
-                    "Queue bound to exchange",
-                    extra={
-                        "queue_name": self.queue_name,
-                        "exchange_name": self.exchange_name,
-                        "routing_key": routing_key
-                    }
-                )
+            for lane in self.lanes:
+                await self._set_up_lane(lane)
 
             logger.info(
                 "RabbitMQ setup completed successfully",
                 extra={
                     "exchange_name": self.exchange_name,
-                    "queue_name": self.queue_name,
+                    "queues": [lane.name for lane in self.lanes],
                     "routing_keys": self.routing_keys
                 }
             )
@@ -100,38 +168,144 @@ class RabbitBaseService(ABC):
                 "Failed to set up RabbitMQ connection",
                 extra={
                     "exchange_name": self.exchange_name,
-                    "queue_name": self.queue_name,
+                    "queues": [lane.name for lane in self.lanes],
                     "error": str(e)
                 },
                 exc_info=True
             )
             raise e
 
-    async def start_consuming(self):
-        logger.info(
-            "Starting to consume messages",
-            extra={"queue_name": self.queue_name}
+    async def _set_up_lane(self, lane: _ConsumerLane):
+        # Each lane has its own channel, so prefetch (QoS) is independent per queue
+        lane.channel = await self.connection.channel()
+        await lane.channel.set_qos(prefetch_count=lane.prefetch_count)
+
+        exchange = await lane.channel.declare_exchange(
+            self.exchange_name,
+            ExchangeType.TOPIC,
+            durable=self.durable
+        )
+        if self.exchange is None:
+            self.exchange = exchange
+
+        logger.debug(
+            "Exchange declared successfully",
+            extra={"exchange_name": self.exchange_name}
         )
 
-        self.consumer_tag = await self.queue.consume(self.process_message_wrapper, no_ack=False)
+        lane.queue = await lane.channel.declare_queue(
+            lane.name,
+            durable=self.durable
+        )
 
         logger.debug(
-            "Consumer started",
+            "Queue declared successfully",
+            extra={"queue_name": lane.name}
+        )
+
+        for routing_key in lane.config.routing_keys:
+            await lane.queue.bind(exchange, routing_key=routing_key)
+            logger.debug(
+                "Queue bound to exchange",
+                extra={
+                    "queue_name": lane.name,
+                    "exchange_name": self.exchange_name,
+                    "routing_key": routing_key
+                }
+            )
+
+        # A routing key served by another lane must not be delivered to this queue as well
+        for other in self.lanes:
+            if other is lane:
+                continue
+            for routing_key in other.config.routing_keys:
+                await lane.queue.unbind(exchange, routing_key=routing_key)
+
+        await self._set_up_retry_queues(lane)
+
+    async def _set_up_retry_queues(self, lane: _ConsumerLane):
+        # Delay queues have no consumers: once the TTL expires the broker dead-letters
+        # the message through the default exchange straight back into the lane queue
+        for attempt in range(1, self.max_retries + 1):
+            await lane.channel.declare_queue(
+                lane.retry_queue_name(attempt),
+                durable=True,
+                arguments={
+                    'x-message-ttl': retry_delay_ms(attempt),
+                    'x-dead-letter-exchange': '',
+                    'x-dead-letter-routing-key': lane.name,
+                }
+            )
+
+        await lane.channel.declare_queue(lane.parking_queue_name, durable=True)
+
+        logger.debug(
+            "Retry queues declared successfully",
             extra={
-                "queue_name": self.queue_name,
-                "consumer_tag": self.consumer_tag
+                "queue_name": lane.name,
+                "retry_queues": [lane.retry_queue_name(attempt) for attempt in range(1, self.max_retries + 1)],
+                "parking_queue": lane.parking_queue_name
             }
         )
 
+    async def start_consuming(self):
+        for lane in self.lanes:
+            logger.info(
+                "Starting to consume messages",
+                extra={"queue_name": lane.name}
+            )
+
+            lane.consumer_tag = await lane.queue.consume(partial(self._dispatch_message, lane), no_ack=False)
+            lane.queue_depth_task = asyncio.create_task(self._report_queue_depth(lane))
+
+            logger.debug(
+                "Consumer started",
+                extra={
+                    "queue_name": lane.name,
+                    "consumer_tag": lane.consumer_tag
+                }
+            )
+
         logger.info("Consumer is running. Waiting for messages...")
 
+    async def _dispatch_message(self, lane: _ConsumerLane, message: AbstractIncomingMessage):
+        # Return to the consumer immediately; the pipeline runs in its own task once a slot is free
+        task = asyncio.create_task(self._process_in_slot(lane, message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process_in_slot(self, lane: _ConsumerLane, message: AbstractIncomingMessage):
+        async with lane.slots.acquire(self.get_routing_key(message)):
+            await self.process_message_wrapper(message, lane)
+
+    @staticmethod
+    def decode_body(message: AbstractIncomingMessage) -> Any:
+        return message_codec.decode_message(message)
+
+    @staticmethod
+    def get_routing_key(message: AbstractIncomingMessage) -> str:
+        # Retried messages come back from a delay queue with the queue name as routing key
+        headers = message.headers or {}
+        return headers.get(ORIGINAL_ROUTING_KEY_HEADER) or message.routing_key
+
+    @staticmethod
+    async def _report_queue_depth(lane: _ConsumerLane):
+        while True:
+            try:
+                declare_ok = await lane.queue.declare()
+                metrics.set_gauge('rabbit.queue.depth', declare_ok.message_count, queue=lane.name)
+                metrics.set_gauge('rabbit.queue.consumers', declare_ok.consumer_count, queue=lane.name)
+            except Exception as e:
+                logger.warning("Failed to read queue depth", extra={"queue_name": lane.name, "error": str(e)})
+            await asyncio.sleep(settings.RABBITMQ_QUEUE_DEPTH_POLL_SECONDS)
+
     @abstractmethod
     async def process_message(self, message: AbstractIncomingMessage):
         ...
 
-    async def process_message_wrapper(self, message: AbstractIncomingMessage):
+    async def process_message_wrapper(self, message: AbstractIncomingMessage, lane: _ConsumerLane):
         message_id = message.message_id or "unknown"
-        routing_key = message.routing_key
+        routing_key = self.get_routing_key(message)
         delivery_tag = message.delivery_tag
 
         logger.debug(
@@ -170,35 +344,91 @@ class RabbitBaseService(ABC):
                 },
                 exc_info=True
             )
+            metrics.inc('rabbit.messages.failed', queue=lane.name)
 
-            if message.redelivered or delivery_tag >= self.max_retries:
-                await message.reject(requeue=False)
-                logger.warning(
-                    "Message rejected permanently (max retries reached or redelivered)",
-                    extra={
-                        "message_id": message_id,
-                        "routing_key": routing_key,
-                        "delivery_tag": delivery_tag,
-                        "redelivered": message.redelivered,
-                        "max_retries": self.max_retries
-                    }
-                )
-            else:
+            try:
+                await self._retry_or_park(lane, message, e)
+            except Exception as publish_error:
+                # The message stays in the queue rather than being lost
                 await message.reject(requeue=True)
-                logger.warning(
-                    "Message rejected and requeued for retry",
+                logger.error(
+                    "Failed to schedule retry, message requeued",
                     extra={
                         "message_id": message_id,
                         "routing_key": routing_key,
-                        "delivery_tag": delivery_tag,
-                        "retry_count": delivery_tag
-                    }
+                        "error": str(publish_error)
+                    },
+                    exc_info=True
                 )
 
+    async def _retry_or_park(self, lane: _ConsumerLane, message: AbstractIncomingMessage, error: Exception):
+        headers = dict(message.headers or {})
+        retry_count = int(headers.get(RETRY_COUNT_HEADER, 0))
+        routing_key = self.get_routing_key(message)
+        headers[ORIGINAL_ROUTING_KEY_HEADER] = routing_key
+
+        if retry_count >= self.max_retries:
+            headers[LAST_ERROR_HEADER] = str(error)[:1024]
+            target_queue = lane.parking_queue_name
+        else:
+            headers[RETRY_COUNT_HEADER] = retry_count + 1
+            target_queue = lane.retry_queue_name(retry_count + 1)
+
+        await lane.channel.default_exchange.publish(
+            Message(
+                message.body,
+                headers=headers,
+                content_type=message.content_type,
+                content_encoding=message.content_encoding,
+                correlation_id=message.correlation_id,
+                message_id=message.message_id,
+                reply_to=message.reply_to,
+                delivery_mode=DeliveryMode.PERSISTENT
+            ),
+            routing_key=target_queue
+        )
+        await message.ack()
+
+        if retry_count >= self.max_retries:
+            metrics.inc('rabbit.messages.parked', queue=lane.name)
+            logger.warning(
+                "Message parked (max retries reached)",
+                extra={
+                    "message_id": message.message_id,
+                    "routing_key": routing_key,
+                    "parking_queue": target_queue,
+                    "max_retries": self.max_retries
+                }
+            )
+        else:
+            metrics.inc('rabbit.messages.retried', queue=lane.name, attempt=retry_count + 1)
+            logger.warning(
+                "Message scheduled for delayed retry",
+                extra={
+                    "message_id": message.message_id,
+                    "routing_key": routing_key,
+                    "retry_count": retry_count + 1,
+                    "delay_ms": retry_delay_ms(retry_count + 1)
+                }
+            )
+
     async def stop_consuming(self):
         logger.info("Stopping message consumption")
 
         try:
+            for lane in self.lanes:
+                if lane.consumer_tag and lane.queue:
+                    await lane.queue.cancel(lane.consumer_tag)
+                    lane.consumer_tag = None
+
+                if lane.queue_depth_task:
+                    lane.queue_depth_task.cancel()
+                    lane.queue_depth_task = None
+
+            if self._tasks:
+                logger.info("Waiting for in-flight messages", extra={"in_flight": len(self._tasks)})
+                await asyncio.wait(set(self._tasks), timeout=settings.RABBITMQ_SHUTDOWN_GRACE_SECONDS)
+
             await self.connection.close()
 
         except Exception as e:
@@ -0,0 +1,98 @@
+import asyncio
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.logger import logger
+from app.core.metrics import metrics
+from app.database.crud.outbox import OUTBOX_PENDING_KEY, OutboxService
+from app.database.db.session import AsyncSessionLocal
+from app.services.rabbit.rabbit_service import RabbitMQPublisher, rabbit_publisher
+
+
+class OutboxRelay:
+    """
+    Publishes committed outbox rows in batches with publisher confirms.
+
+    A row is marked published only after the broker confirmed it, so a crash
+    in between publishes it again with the same message_id (at least once;
+    consumers can drop repeats by message_id). Failed rows are retried up to
+    ``max_attempts`` times.
+    """
+
+    def __init__(self, publisher: RabbitMQPublisher, batch_size: int, poll_interval: float, max_attempts: int):
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def relay_batch(self) -> int:
+        """Publishes one batch; returns how many rows were claimed."""
+        async with AsyncSessionLocal() as session:
+            outbox_service = OutboxService(session)
+            rows = await outbox_service.claim_unpublished(self.batch_size, self.max_attempts)
+            if not rows:
+                await session.commit()
+                return 0
+
+            results = await self.publisher.publish_batch([
+                {'routing_key': row.routing_key, 'payload': row.payload, 'message_id': row.message_id}
+                for row in rows
+            ])
+
+            published = [row.id for row, result in zip(rows, results) if result.ok]
+            failed = [row.id for row, result in zip(rows, results) if not result.ok]
+            await outbox_service.mark_published(published)
+            await outbox_service.mark_failed(failed)
+            await session.commit()
+
+        metrics.inc('outbox.published', len(published))
+        if failed:
+            metrics.inc('outbox.failed', len(failed))
+            logger.error(f'Outbox relay failed to publish {len(failed)} of {len(rows)} messages',
+                         extra={'failed_ids': failed})
+        return len(rows)
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.relay_batch()
+            except Exception as e:
+                logger.error(f'Error in outbox relay: {e}', exc_info=True)
+                claimed = 0
+
+            # A full batch means more rows are probably waiting
+            if claimed >= self.batch_size:
+                continue
+            if self._stopping:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except TimeoutError:
+                pass
+
+    def stop(self):
+        """Makes ``run`` return once everything already committed is published."""
+        self._stopping = True
+        self.notify()
+
+
+outbox_relay = OutboxRelay(
+    rabbit_publisher,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_SECONDS,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS
+)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_outbox_relay(session: Session):
+    if session.info.pop(OUTBOX_PENDING_KEY, False):
+        outbox_relay.notify()
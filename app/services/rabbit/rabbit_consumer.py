@@ -1,21 +1,22 @@
 import ast
-import json
 from enum import Enum
 
 from aio_pika.abc import AbstractIncomingMessage
 
+from app.config import settings
 from app.core.logger import logger
+from app.database.crud.outbox import OutboxService
 from app.database.crud.post import PostService
 from app.database.crud.request_filter import RequestFiltersService
-from app.database.db.session import get_async_db, get_db
+from app.database.db.session import UnitOfWork, get_async_db, get_db
 from app.database.schemas.post import PostUpdate
 from app.database.schemas.request_filters import RequestFiltersCreate
+from app.services.ai_post_generation.coalescer import generation_coalescer
 from app.services.ai_post_generation.generate_post import GeneratePost
 from app.services.ai_post_generation.post_serializer import SerializePost
 from app.services.ai_post_generation.types import Filters
 from app.services.rabbit.consumer_base import RabbitBaseService
-from app.services.rabbit.rabbit_service import RabbitMQPublisher
-from app.services.rabbit.types import RabbitChatBotTextMessage, RabbitChatBotImageMessage
+from app.services.rabbit.types import RabbitChatBotTextMessage, RabbitChatBotImageMessage, QueueLane
 
 
 class PostsRoutingKeys(str, Enum):
@@ -23,12 +24,28 @@ class PostsRoutingKeys(str, Enum):
     POSTS_PUBLISH_POST = "posts_bot.publish_post"
 
 
+def posts_consumer_lanes() -> list[QueueLane]:
+    """Generation jobs take minutes, so publishing a stored post gets its own queue and slots."""
+    return [
+        QueueLane(
+            queue_name=settings.RABBITMQ_QUEUE_NAME,
+            routing_keys=[PostsRoutingKeys.POSTS_GENERATE_WITH_FILTERS.value],
+            worker_slots=settings.RABBITMQ_WORKER_SLOTS,
+            routing_key_limits=settings.RABBITMQ_ROUTING_KEY_LIMITS
+        ),
+        QueueLane(
+            queue_name=settings.RABBITMQ_PUBLISH_QUEUE_NAME,
+            routing_keys=[PostsRoutingKeys.POSTS_PUBLISH_POST.value],
+            worker_slots=settings.RABBITMQ_PUBLISH_WORKER_SLOTS,
+            routing_key_limits=settings.RABBITMQ_ROUTING_KEY_LIMITS
+        ),
+    ]
+
 
 class RabbitPostsConsumer(RabbitBaseService):
     async def process_message(self, message: AbstractIncomingMessage):
-        message_data = message.body.decode("utf-8")
-        payload = json.loads(message_data).get("payload")
-        routing_key = message.routing_key
+        payload = self.decode_body(message).get("payload")
+        routing_key = self.get_routing_key(message)
 
         logger.info(f"Received new message", extra={"payload": payload})
 
@@ -38,6 +55,7 @@ class RabbitPostsConsumer(RabbitBaseService):
             return
 
         if route == PostsRoutingKeys.POSTS_GENERATE_WITH_FILTERS:
+            # The session is closed before generation, which opens its own for each stage
             async with get_async_db() as db:
                 request_filters_service = RequestFiltersService(db)
 
@@ -45,21 +63,23 @@ class RabbitPostsConsumer(RabbitBaseService):
                     user_uuid=payload.get("user_uuid"),
                     **payload.get("filters")
                 ))
-                generator = GeneratePost(Filters.model_validate(payload.get("filters", {})), request.id, payload.get("user_uuid"))
+            generator = GeneratePost(Filters.model_validate(payload.get("filters", {})), request.id, payload.get("user_uuid"))
 
-                await generator.generate_post()
+            await generation_coalescer.generate(generator)
         elif route == PostsRoutingKeys.POSTS_PUBLISH_POST:
             post_id = payload.get("post_id")
-            async with get_async_db() as db:
-                post_service = PostService(db)
-                post = await post_service.get(post_id)
-                await post_service.update(post_id, PostUpdate(is_posted=True))
-                serializer = SerializePost(post)
-                text = serializer.serialize()
-                await RabbitMQPublisher().publish(
-                    routing_key="posts_service.publish_post",
-                    payload={"text": text, 'images': post.images.split(',')}
-                )
+            # is_posted and the publish message are committed together
+            async with UnitOfWork():
+                async with get_async_db() as db:
+                    post_service = PostService(db)
+                    post = await post_service.get(post_id)
+                    await post_service.update(post_id, PostUpdate(is_posted=True))
+                    serializer = SerializePost(post)
+                    text = serializer.serialize()
+                    await OutboxService(db).enqueue(
+                        "posts_service.publish_post",
+                        {"text": text, 'images': post.images.split(',')}
+                    )
 
 
 
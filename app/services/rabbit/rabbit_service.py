@@ -1,103 +1,169 @@
 import asyncio
-import json
 import uuid
 from datetime import datetime, UTC
+from typing import Any
 
-from aio_pika import connect_robust, Message, ExchangeType, DeliveryMode
+from aio_pika import connect_robust, Message, DeliveryMode, ExchangeType
+from aio_pika.abc import AbstractChannel, AbstractExchange, AbstractRobustConnection
+from aio_pika.pool import Pool
+from pamqp.commands import Basic
 
 from app.config import settings
-
-import asyncio
-import json
-import uuid
-from datetime import datetime, UTC
-from typing import Any
-from aio_pika import connect_robust, Message, DeliveryMode, ExchangeType, Queue
-
 from app.core.logger import logger
+from app.core.metrics import metrics
+from app.services.rabbit.codec import message_codec
+from app.services.rabbit.rpc_dispatcher import RpcDispatcher, RpcRequest
+from app.services.rabbit.types import PublishResult
 
 
 class RabbitMQPublisher:
-    def __init__(self, exchange_type: ExchangeType = ExchangeType.TOPIC):
+    """
+    Publisher, который держит одно robust-соединение и пул каналов.
+
+    Используется как синглтон процесса (``rabbit_publisher``): соединение
+    открывается один раз при старте в main.py, публикации берут канал из пула.
+    """
+
+    def __init__(
+            self,
+            exchange_type: ExchangeType = ExchangeType.TOPIC,
+            channel_pool_size: int = settings.RABBITMQ_PUBLISHER_CHANNEL_POOL_SIZE
+    ):
         self.url = settings.RABBITMQ_URL
         self.exchange_name = settings.RABBITMQ_EXCHANGE_NAME
         self.exchange_type = exchange_type
-        self.connection = None
-        self.channel = None
-        self.exchange = None
-
-        # RPC functionality
-        self.callback_queue: Queue | None = None
-        self.pending_requests: dict[str, asyncio.Future] = {}
-        self.consumer_tag: str | None = None
-
-    async def connect(self):
-        """Подключение к RabbitMQ"""
-        self.connection = await connect_robust(self.url)
-        self.channel = await self.connection.channel()
-        self.exchange = await self.channel.declare_exchange(
-            self.exchange_name,
-            type=self.exchange_type,
-            durable=True
-        )
+        self.channel_pool_size = channel_pool_size
+        self.connection: AbstractRobustConnection | None = None
+        self.channel_pool: Pool[AbstractChannel] | None = None
+        self._connect_lock = asyncio.Lock()
 
-        # Создаем временную очередь для RPC ответов
-        await self._setup_rpc_queue()
+        # RPC functionality: один общий канал ответов на процесс
+        self.rpc = RpcDispatcher()
 
-    async def _setup_rpc_queue(self):
-        """Настройка очереди для получения RPC ответов"""
-        self.callback_queue = await self.channel.declare_queue(
-            exclusive=True,
-            auto_delete=True
-        )
-
-        # Начинаем слушать ответы
-        self.consumer_tag = await self.callback_queue.consume(
-            self._on_rpc_response,
-            no_ack=True
-        )
-        logger.info(f"RPC callback queue created: {self.callback_queue.name}")
+    @property
+    def is_connected(self) -> bool:
+        return self.connection is not None and not self.connection.is_closed
 
-    async def _on_rpc_response(self, message):
-        """Обработчик RPC ответов"""
-        correlation_id = message.correlation_id
-
-        if correlation_id in self.pending_requests:
-            future = self.pending_requests.pop(correlation_id)
+    async def connect(self):
+        """Подключение к RabbitMQ (идемпотентно)"""
+        async with self._connect_lock:
+            if self.connection is not None:
+                return
+
+            self.connection = await connect_robust(self.url)
+            self.channel_pool = Pool(self._create_channel, max_size=self.channel_pool_size)
+            async with self.channel_pool.acquire() as channel:
+                await channel.declare_exchange(
+                    self.exchange_name,
+                    type=self.exchange_type,
+                    durable=True
+                )
+
+            await self.rpc.start(self.connection)
+
+            logger.info(
+                "RabbitMQ publisher connected",
+                extra={"exchange_name": self.exchange_name, "channel_pool_size": self.channel_pool_size}
+            )
 
-            if not future.cancelled():
-                try:
-                    response_data = json.loads(message.body.decode())
-                    future.set_result(response_data)
-                    logger.info(f"Received RPC response for correlation_id: {correlation_id}")
-                except json.JSONDecodeError as e:
-                    future.set_exception(ValueError(f"Invalid JSON response: {e}"))
-                except Exception as e:
-                    future.set_exception(e)
+    async def _create_channel(self) -> AbstractChannel:
+        return await self.connection.channel()
 
-    async def publish(self, routing_key: str, payload: dict):
-        """Обычная публикация сообщения (fire-and-forget)"""
-        if self.exchange is None:
-            await self.connect()
+    async def _get_exchange(self, channel: AbstractChannel) -> AbstractExchange:
+        # Exchange уже объявлен в connect(), здесь только объект без round trip
+        return await channel.get_exchange(self.exchange_name, ensure=False)
 
+    @staticmethod
+    def _build_message(routing_key: str, payload: dict, message_id: str | None = None) -> Message:
         correlation_id = str(uuid.uuid4())
-        message_body = json.dumps({
+        message_body, content_type, content_encoding = message_codec.encode({
             "type": routing_key,
             "payload": payload,
             "timestamp": datetime.now(UTC).isoformat(),
             "correlation_id": correlation_id
-        }).encode()
+        })
 
-        message = Message(
+        return Message(
             message_body,
-            content_type="application/json",
+            content_type=content_type,
+            content_encoding=content_encoding,
             correlation_id=correlation_id,
+            message_id=message_id,
             delivery_mode=DeliveryMode.PERSISTENT
         )
 
-        await self.exchange.publish(message, routing_key=routing_key)
+    async def publish(self, routing_key: str, payload: dict):
+        """Обычная публикация сообщения (fire-and-forget)"""
+        if self.connection is None:
+            await self.connect()
+
+        message = self._build_message(routing_key, payload)
+
+        async with self.channel_pool.acquire() as channel:
+            exchange = await self._get_exchange(channel)
+            await exchange.publish(message, routing_key=routing_key)
         logger.info(f"Published message with routing_key: {routing_key}")
 
+    async def publish_batch(self, messages: list[dict[str, Any]]) -> list[PublishResult]:
+        """
+        Публикует пачку сообщений с publisher confirms
+
+        Все публикации отправляются подряд на одном канале, подтверждения
+        брокера ожидаются вместе, а не по одному на сообщение.
+
+        Args:
+            messages: [{"routing_key": "...", "payload": {...}, "message_id": "..."}]
+                      message_id необязателен
+
+        Returns:
+            Результат по каждому сообщению в том же порядке
+        """
+        if self.connection is None:
+            await self.connect()
+
+        results: list[PublishResult] = []
+        batch_size = settings.RABBITMQ_PUBLISH_BATCH_SIZE
+
+        async with self.channel_pool.acquire() as channel:
+            exchange = await self._get_exchange(channel)
+
+            for start in range(0, len(messages), batch_size):
+                chunk = messages[start:start + batch_size]
+                built = [
+                    self._build_message(item["routing_key"], item["payload"], item.get("message_id"))
+                    for item in chunk
+                ]
+                confirmations = await asyncio.gather(
+                    *(exchange.publish(message, routing_key=item["routing_key"])
+                      for item, message in zip(chunk, built)),
+                    return_exceptions=True
+                )
+
+                for item, message, confirmation in zip(chunk, built, confirmations):
+                    error = None
+                    if isinstance(confirmation, BaseException):
+                        error = str(confirmation) or type(confirmation).__name__
+                    elif isinstance(confirmation, Basic.Nack):
+                        error = "Message was nacked by broker"
+
+                    results.append(PublishResult(
+                        routing_key=item["routing_key"],
+                        correlation_id=message.correlation_id,
+                        message_id=item.get("message_id"),
+                        ok=error is None,
+                        error=error
+                    ))
+
+        failed = sum(1 for result in results if not result.ok)
+        metrics.inc('rabbit.publish.batch_messages', len(results))
+        if failed:
+            metrics.inc('rabbit.publish.batch_failed', failed)
+            logger.warning(f"Batch publish finished with {failed} failed of {len(results)} messages")
+        else:
+            logger.info(f"Batch published {len(results)} messages")
+
+        return results
+
     async def publish_and_wait_response(
             self,
             routing_key: str,
@@ -119,45 +185,32 @@ class RabbitMQPublisher:
             TimeoutError: Если ответ не получен в течение timeout
             ConnectionError: Если нет подключения
         """
-        if self.exchange is None:
+        if self.connection is None:
             await self.connect()
 
-        if self.callback_queue is None:
-            raise ConnectionError("RPC callback queue not initialized")
-
         correlation_id = str(uuid.uuid4())
-        future = asyncio.Future()
-        self.pending_requests[correlation_id] = future
+        message_body, content_type, content_encoding = message_codec.encode({
+            "action": routing_key,
+            "data": payload,
+            "timestamp": datetime.now(UTC).isoformat(),
+            "correlation_id": correlation_id,
+            "rpc": True  # Флаг что это RPC запрос
+        })
 
         try:
-            message_body = json.dumps({
-                "action": routing_key,
-                "data": payload,
-                "timestamp": datetime.now(UTC).isoformat(),
-                "correlation_id": correlation_id,
-                "rpc": True  # Флаг что это RPC запрос
-            }).encode()
-
-            message = Message(
+            logger.info(f"Publishing RPC request with routing_key: {routing_key}, correlation_id: {correlation_id}")
+            return await self.rpc.call(
+                routing_key,
                 message_body,
-                content_type="application/json",
                 correlation_id=correlation_id,
-                reply_to=self.callback_queue.name,  # Указываем куда отправить ответ
-                delivery_mode=DeliveryMode.PERSISTENT
+                exchange_name=self.exchange_name,
+                timeout=timeout,
+                content_type=content_type,
+                content_encoding=content_encoding
             )
-
-            await self.exchange.publish(message, routing_key=routing_key)
-            logger.info(f"Published RPC request with routing_key: {routing_key}, correlation_id: {correlation_id}")
-
-            # Ждем ответ с таймаутом
-            response = await asyncio.wait_for(future, timeout=timeout)
-            return response
-
-        except asyncio.TimeoutError:
-            self.pending_requests.pop(correlation_id, None)
-            raise TimeoutError(f"RPC timeout for routing_key: {routing_key}")
+        except TimeoutError:
+            raise
         except Exception as e:
-            self.pending_requests.pop(correlation_id, None)
             logger.error(f"Error in RPC request: {e}")
             raise
 
@@ -183,99 +236,58 @@ class RabbitMQPublisher:
         if self.connection is None:
             await self.connect()
 
-        if self.callback_queue is None:
-            raise ConnectionError("RPC callback queue not initialized")
-
-        correlation_id = str(uuid.uuid4())
-        future = asyncio.Future()
-        self.pending_requests[correlation_id] = future
+        request = self._build_rpc_request(service_queue, action, data)
 
         try:
-            request_payload = {
-                "action": action,
-                "data": data or {},
-                "timestamp": datetime.now(UTC).isoformat(),
-                "correlation_id": correlation_id
-            }
-
-            message = Message(
-                json.dumps(request_payload).encode(),
-                content_type="application/json",
-                correlation_id=correlation_id,
-                reply_to=self.callback_queue.name,
-                delivery_mode=DeliveryMode.PERSISTENT
+            # Отправляем напрямую в очередь (default exchange)
+            logger.info(f"Sending RPC request to queue: {service_queue}, action: {action}")
+            return await self.rpc.call(
+                request.routing_key,
+                request.body,
+                correlation_id=request.correlation_id,
+                timeout=timeout,
+                content_type=request.content_type,
+                content_encoding=request.content_encoding
             )
-
-            # Отправляем напрямую в очередь
-            await self.channel.default_exchange.publish(
-                message,
-                routing_key=service_queue
-            )
-
-            logger.info(f"Sent RPC request to queue: {service_queue}, action: {action}")
-
-            response = await asyncio.wait_for(future, timeout=timeout)
-            return response
-
-        except asyncio.TimeoutError:
-            self.pending_requests.pop(correlation_id, None)
+        except TimeoutError:
             raise TimeoutError(f"RPC timeout for queue: {service_queue}, action: {action}")
         except Exception as e:
-            self.pending_requests.pop(correlation_id, None)
             logger.error(f"Error in RPC request to {service_queue}: {e}")
             raise
 
-    async def send_multiple_rpc_requests(
-            self,
-            requests: list,
-            timeout: int = 30
-    ) -> list:
-        """
-        Отправляет несколько RPC запросов параллельно
-
-        Args:
-            requests: Список словарей с параметрами запросов
-                     [{"service_queue": "user_service", "action": "get_user", "data": {"id": 1}}]
-            timeout: Общий таймаут для всех запросов
-
-        Returns:
-            Список ответов в том же порядке
-        """
-        tasks = []
-
-        for request in requests:
-            task = self.send_rpc_request(
-                service_queue=request["service_queue"],
-                action=request["action"],
-                data=request.get("data"),
-                timeout=timeout
-            )
-            tasks.append(task)
-            print('task added')
-
-        try:
-            responses = await asyncio.gather(*tasks)
-            return responses
-        except Exception as e:
-            logger.error(f"Error in multiple RPC requests: {e}")
-            raise
+    @staticmethod
+    def _build_rpc_request(service_queue: str, action: str, data: dict | None = None) -> RpcRequest:
+        correlation_id = str(uuid.uuid4())
+        request_payload = {
+            "action": action,
+            "data": data or {},
+            "timestamp": datetime.now(UTC).isoformat(),
+            "correlation_id": correlation_id
+        }
+        body, content_type, content_encoding = message_codec.encode(request_payload)
+        return RpcRequest(
+            service_queue,
+            body,
+            correlation_id=correlation_id,
+            content_type=content_type,
+            content_encoding=content_encoding
+        )
 
     async def close(self):
         """Закрытие соединения"""
-        # Отменяем все pending запросы
-        for correlation_id, future in self.pending_requests.items():
-            if not future.cancelled():
-                future.cancel()
-        self.pending_requests.clear()
+        # Останавливаем RPC dispatcher и завершаем pending запросы
+        await self.rpc.stop()
 
-        # Останавливаем consumer
-        if self.consumer_tag and self.callback_queue:
-            await self.callback_queue.cancel(self.consumer_tag)
+        if self.channel_pool:
+            await self.channel_pool.close()
 
         if self.connection:
             await self.connection.close()
             logger.info("RabbitMQ connection closed")
 
+        self.connection = None
+        self.channel_pool = None
+
     async def __aenter__(self):
         await self.connect()
         return self
@@ -284,6 +296,9 @@ class RabbitMQPublisher:
         await self.close()
 
 
+rabbit_publisher = RabbitMQPublisher()
+
+
 if __name__ == "__main__":
     async def main():
         publisher = RabbitMQPublisher()
@@ -0,0 +1,283 @@
+import asyncio
+import math
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable
+
+from aio_pika import Message, DeliveryMode
+from aio_pika.abc import AbstractChannel, AbstractIncomingMessage, AbstractQueue, AbstractRobustConnection
+
+from app.config import settings
+from app.core.logger import logger
+from app.core.metrics import metrics
+from app.services.rabbit.codec import message_codec
+
+DIRECT_REPLY_TO = "amq.rabbitmq.reply-to"
+
+
+class RpcTimeoutWheel:
+    """
+    Hashed timer wheel for RPC deadlines.
+
+    Deadlines are bucketed by tick, and a single background task expires whole
+    buckets, instead of arming one timer per in-flight call.
+    """
+
+    def __init__(self, tick: float):
+        self.tick = tick
+        self._buckets: dict[int, set[str]] = defaultdict(set)
+        self._task: asyncio.Task | None = None
+
+    def schedule(self, correlation_id: str, timeout: float) -> int:
+        deadline = asyncio.get_running_loop().time() + timeout
+        slot = math.ceil(deadline / self.tick)
+        self._buckets[slot].add(correlation_id)
+        return slot
+
+    def discard(self, correlation_id: str, slot: int):
+        bucket = self._buckets.get(slot)
+        if bucket is None:
+            return
+        bucket.discard(correlation_id)
+        if not bucket:
+            del self._buckets[slot]
+
+    def start(self, on_expire: Callable[[str], None]):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(on_expire))
+
+    async def _run(self, on_expire: Callable[[str], None]):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.tick)
+            current_slot = math.floor(loop.time() / self.tick)
+            for slot in sorted(slot for slot in self._buckets if slot <= current_slot):
+                for correlation_id in self._buckets.pop(slot, ()):
+                    on_expire(correlation_id)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._buckets.clear()
+
+
+class _PendingCall:
+    __slots__ = ('future', 'slot', 'routing_key')
+
+    def __init__(self, future: asyncio.Future, slot: int, routing_key: str):
+        self.future = future
+        self.slot = slot
+        self.routing_key = routing_key
+
+
+class RpcRequest:
+    __slots__ = ('routing_key', 'body', 'correlation_id', 'exchange_name', 'content_type', 'content_encoding')
+
+    def __init__(
+            self,
+            routing_key: str,
+            body: bytes,
+            correlation_id: str | None = None,
+            exchange_name: str | None = None,
+            content_type: str = "application/json",
+            content_encoding: str | None = None
+    ):
+        self.routing_key = routing_key
+        self.body = body
+        self.correlation_id = correlation_id or str(uuid.uuid4())
+        self.exchange_name = exchange_name
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+
+
+class RpcDispatcher:
+    """
+    Shared RPC reply channel for the whole process.
+
+    Requests are published with ``reply_to=amq.rabbitmq.reply-to`` on a single
+    channel that also consumes the replies, and replies are routed back to
+    waiting callers by correlation id.
+    """
+
+    def __init__(
+            self,
+            timeout_tick: float = settings.RABBITMQ_RPC_TIMEOUT_TICK_SECONDS,
+            late_reply_memory: int = 1024
+    ):
+        self.connection: AbstractRobustConnection | None = None
+        self.channel: AbstractChannel | None = None
+        self.reply_queue: AbstractQueue | None = None
+        self.consumer_tag: str | None = None
+
+        self._pending: dict[str, _PendingCall] = {}
+        self._expired: OrderedDict[str, None] = OrderedDict()
+        self._late_reply_memory = late_reply_memory
+        self._wheel = RpcTimeoutWheel(timeout_tick)
+        self._restore_task: asyncio.Task | None = None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def start(self, connection: AbstractRobustConnection):
+        self.connection = connection
+        self.channel = await connection.channel()
+        await self._consume_replies()
+        self._wheel.start(self._expire)
+        connection.reconnect_callbacks.add(self._on_reconnect)
+        logger.info("RPC dispatcher started", extra={"reply_to": DIRECT_REPLY_TO})
+
+    async def _consume_replies(self):
+        # Direct reply-to requires consuming in no-ack mode before publishing
+        self.reply_queue = await self.channel.get_queue(DIRECT_REPLY_TO, ensure=False)
+        self.consumer_tag = await self.reply_queue.consume(self._on_reply, no_ack=True)
+
+    def _on_reconnect(self, *_: Any):
+        # Kept so the task is not garbage-collected mid-restore and stop() can cancel it
+        if self._restore_task is not None and not self._restore_task.done():
+            self._restore_task.cancel()
+        self._restore_task = asyncio.create_task(self._restore())
+
+    async def _restore(self):
+        # Replies addressed to the previous channel are lost for good
+        self._fail_pending(ConnectionError("RabbitMQ connection was re-established, RPC reply lost"))
+        try:
+            await self._consume_replies()
+            logger.info("RPC dispatcher reply consumer restored")
+        except Exception as e:
+            logger.error("Failed to restore RPC reply consumer", extra={"error": str(e)}, exc_info=True)
+
+    async def call(
+            self,
+            routing_key: str,
+            body: bytes,
+            correlation_id: str | None = None,
+            exchange_name: str | None = None,
+            timeout: float = 30,
+            content_type: str = "application/json",
+            content_encoding: str | None = None
+    ) -> dict[Any, Any]:
+        """
+        Publishes a request and waits for its reply.
+
+        ``exchange_name=None`` publishes to the default exchange, i.e. directly
+        into the queue named by ``routing_key``.
+        """
+        request = RpcRequest(routing_key, body, correlation_id, exchange_name, content_type, content_encoding)
+        future = self._register(request, timeout)
+        try:
+            await self._publish(request)
+            return await future
+        finally:
+            self._forget(request.correlation_id)
+
+    def _register(self, request: RpcRequest, timeout: float) -> asyncio.Future:
+        if self.channel is None:
+            raise ConnectionError("RPC dispatcher is not started")
+
+        future = asyncio.get_running_loop().create_future()
+        slot = self._wheel.schedule(request.correlation_id, timeout)
+        self._pending[request.correlation_id] = _PendingCall(future, slot, request.routing_key)
+        return future
+
+    async def _publish(self, request: RpcRequest):
+        message = Message(
+            request.body,
+            content_type=request.content_type,
+            content_encoding=request.content_encoding,
+            correlation_id=request.correlation_id,
+            reply_to=DIRECT_REPLY_TO,
+            delivery_mode=DeliveryMode.PERSISTENT
+        )
+        if request.exchange_name is None:
+            exchange = self.channel.default_exchange
+        else:
+            exchange = await self.channel.get_exchange(request.exchange_name, ensure=False)
+
+        await exchange.publish(message, routing_key=request.routing_key)
+        metrics.inc('rabbit.rpc.requests')
+
+    def _forget(self, correlation_id: str):
+        pending = self._pending.pop(correlation_id, None)
+        if pending is not None:
+            self._wheel.discard(correlation_id, pending.slot)
+
+    def _expire(self, correlation_id: str):
+        pending = self._pending.pop(correlation_id, None)
+        if pending is None:
+            return
+
+        self._expired[correlation_id] = None
+        while len(self._expired) > self._late_reply_memory:
+            self._expired.popitem(last=False)
+
+        metrics.inc('rabbit.rpc.timeouts')
+        if not pending.future.done():
+            pending.future.set_exception(TimeoutError(f"RPC timeout for routing_key: {pending.routing_key}"))
+
+    async def _on_reply(self, message: AbstractIncomingMessage):
+        correlation_id = message.correlation_id
+        pending = self._pending.pop(correlation_id, None)
+
+        if pending is None:
+            if self._expired.pop(correlation_id, None) is not None:
+                metrics.inc('rabbit.rpc.late_replies')
+                logger.warning(f"Late RPC reply for correlation_id: {correlation_id}")
+            else:
+                metrics.inc('rabbit.rpc.orphaned_replies')
+                logger.warning(f"Orphaned RPC reply for correlation_id: {correlation_id}")
+            return
+
+        self._wheel.discard(correlation_id, pending.slot)
+        if pending.future.done():
+            return
+
+        try:
+            response_data = message_codec.decode_message(message)
+            pending.future.set_result(response_data)
+            logger.info(f"Received RPC response for correlation_id: {correlation_id}")
+        except ValueError as e:
+            pending.future.set_exception(ValueError(f"Invalid RPC response body: {e}"))
+        except Exception as e:
+            pending.future.set_exception(e)
+
+    def _fail_pending(self, error: Exception):
+        pending_calls = list(self._pending.values())
+        self._pending.clear()
+        for pending in pending_calls:
+            if not pending.future.done():
+                pending.future.set_exception(error)
+
+    async def stop(self):
+        if self.connection is not None:
+            self.connection.reconnect_callbacks.discard(self._on_reconnect)
+
+        if self._restore_task is not None:
+            self._restore_task.cancel()
+            try:
+                await self._restore_task
+            except asyncio.CancelledError:
+                pass
+            self._restore_task = None
+
+        await self._wheel.stop()
+        self._fail_pending(ConnectionError("RPC dispatcher stopped"))
+
+        if self.consumer_tag and self.reply_queue:
+            try:
+                await self.reply_queue.cancel(self.consumer_tag)
+            except Exception as e:
+                logger.warning("Error while cancelling RPC reply consumer", extra={"error": str(e)})
+
+        if self.channel is not None and not self.channel.is_closed:
+            await self.channel.close()
+
+        self.connection = None
+        self.channel = None
+        self.reply_queue = None
+        self.consumer_tag = None
@@ -6,4 +6,21 @@ class RabbitChatBotTextMessage(BaseModel):
     response: str
 
 class RabbitChatBotImageMessage(RabbitChatBotTextMessage):
-    lot_id: int
\ No newline at end of file
+    lot_id: int
+
+
+class QueueLane(BaseModel):
+    """One consumer queue with its own bindings, prefetch and concurrency."""
+    queue_name: str
+    routing_keys: list[str]
+    worker_slots: int
+    prefetch_count: int | None = None
+    routing_key_limits: dict[str, int] = {}
+
+
+class PublishResult(BaseModel):
+    routing_key: str
+    correlation_id: str
+    message_id: str | None = None
+    ok: bool
+    error: str | None = None
@@ -0,0 +1,112 @@
+"""
+Microbenchmark of the Rabbit message codecs on payloads shaped like ours.
+
+    python -m benchmarks.codec_benchmark [--iterations 2000]
+
+Codecs and compressors that are not installed are skipped.
+"""
+import argparse
+import random
+import string
+import time
+from datetime import datetime, UTC
+from typing import Any, Callable
+
+from app.services.rabbit.codec import available_codecs, available_compressors
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return ' '.join(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(count))
+
+
+def lot_prompt_payload(rng: random.Random, lots: int = 20) -> dict[str, Any]:
+    # Same layout as Transformers.transform_lot_for_ai output for a search page
+    text = ''
+    for idx in range(lots):
+        text += (f'{idx + 1}. #Lot ID: {rng.randint(10_000_000, 99_999_999)}\n'
+                 f'Auction: copart\nMake: TOYOTA\nModel: CAMRY\nSeries: {_words(rng, 2)}\n'
+                 f'Damage primary: FRONT END\nDamage secondary: N/A\nYear: {rng.randint(2012, 2024)}\n'
+                 f'Keys: Yes\nSeller: {_words(rng, 3)}\n'
+                 f'Odometer(odometer status: ACTUAL): {rng.randint(1000, 200000)} miles\n'
+                 f'Document: CLEAR, Document old: CLEAR\nTransmission: AUTOMATIC\n'
+                 f'Status: RUNS AND DRIVES\nPrice reserve: N/A\n\n')
+    return {
+        "action": "post_generator.generate_response.text",
+        "data": {"prompt": text, "assistant_name": "lot_chooser"},
+        "timestamp": datetime.now(UTC).isoformat(),
+        "correlation_id": "7b1c1f2e-2f7a-4c3e-9a53-0d9f3c1f6a11",
+        "rpc": True,
+    }
+
+
+def image_reply_payload(rng: random.Random) -> dict[str, Any]:
+    response = repr({
+        'lot_id': rng.randint(10_000_000, 99_999_999),
+        'description': _words(rng, 180),
+        'condition_score': rng.randint(1, 10),
+    })
+    return {"data": {"request_id": 1, "response": response}}
+
+
+def generated_posts_payload(rng: random.Random, posts: int = 7) -> dict[str, Any]:
+    return {
+        "type": "posts_service.generated_posts",
+        "payload": {
+            "posts": [
+                {
+                    "text": _words(rng, 160),
+                    "images": [f"https://cs.copart.com/v1/AUTH_svc.pdoc00001/{_words(rng, 1)}.JPG" for _ in range(5)],
+                    "link": f"https://bidauto.online/lot/{rng.randint(10_000_000, 99_999_999)}?auction_name=COPART",
+                    "post_id": idx,
+                }
+                for idx in range(posts)
+            ],
+            "request_id": 42,
+            "user_uuid": "0b5cba1e-4cb4-4a43-9c55-f1f0c8e1d2a3",
+        },
+        "timestamp": datetime.now(UTC).isoformat(),
+        "correlation_id": "a1e0e5b4-3f51-4d41-8f1e-2c9f1b7d6e10",
+    }
+
+
+def _time(fn: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def run(iterations: int):
+    rng = random.Random(42)
+    payloads = {
+        "lot_prompt": lot_prompt_payload(rng),
+        "image_reply": image_reply_payload(rng),
+        "generated_posts": generated_posts_payload(rng),
+    }
+    codecs = available_codecs()
+    compressors: dict[str, Any] = {"none": None, **available_compressors()}
+
+    print(f"{'payload':<16} {'codec':<8} {'compress':<8} {'bytes':>8} {'encode us':>10} {'decode us':>10}")
+    for payload_name, payload in payloads.items():
+        for codec_name, codec in codecs.items():
+            for compressor_name, compressor in compressors.items():
+                def encode():
+                    body = codec.encode(payload)
+                    return compressor.compress(body) if compressor else body
+
+                encoded = encode()
+
+                def decode():
+                    body = compressor.decompress(encoded) if compressor else encoded
+                    return codec.decode(body)
+
+                encode_us = _time(encode, iterations)
+                decode_us = _time(decode, iterations)
+                print(f"{payload_name:<16} {codec_name:<8} {compressor_name:<8} "
+                      f"{len(encoded):>8} {encode_us:>10.1f} {decode_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--iterations", type=int, default=2000)
+    run(arg_parser.parse_args().iterations)
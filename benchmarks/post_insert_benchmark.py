@@ -0,0 +1,94 @@
+"""
+Compares the per-row ``BaseService.create(flush=True)`` loop with ``PostService.bulk_create``.
+
+    python -m benchmarks.post_insert_benchmark [--rows 2000] [--url sqlite+aiosqlite:///./bench.sqlite]
+
+Both paths insert the same generated posts into a freshly created schema and report rows/sec.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, UTC
+from typing import Any
+
+from dateutil import parser
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database.crud.post import PostService
+from app.database.enums import AuctionEnum
+from app.database.models import Base
+from app.database.schemas.post import PostCreate
+
+
+def post_rows(rows: int, request_id: int) -> list[dict[str, Any]]:
+    created_at = datetime.now(UTC)
+    return [
+        {
+            'lot_id': 40_000_000 + idx,
+            'auction': AuctionEnum.COPART,
+            'title': '2019 TOYOTA CAMRY SE',
+            'odometer': 10_000 + idx,
+            'vin': f'4T1B11HK{idx:09d}',
+            'status': 'RUNS AND DRIVES',
+            'year': 2019,
+            'auction_date': '2025-06-01T15:00:00+00:00',
+            'delivery_price': 550,
+            'shipping_price': 1_250,
+            'average_sell_price': None,
+            'is_posted': False,
+            'request_id': request_id,
+            'images': ','.join(f'https://cs.copart.com/v1/AUTH_svc.pdoc00001/{idx}_{n}.JPG' for n in range(10)),
+            'created_at': created_at,
+        }
+        for idx in range(rows)
+    ]
+
+
+async def loop_insert(session: AsyncSession, rows: list[dict[str, Any]]):
+    # Mirrors the previous create_posts_batch: validation, dateutil and a flush per row
+    post_service = PostService(session)
+    for row in rows:
+        data = {**row, 'auction_date': parser.parse(row['auction_date'])}
+        data.pop('created_at')
+        await post_service.create(PostCreate(**data), flush=True)
+    await session.commit()
+
+
+async def bulk_insert(session: AsyncSession, rows: list[dict[str, Any]]):
+    await PostService(session).bulk_create(
+        [{**row, 'auction_date': datetime.fromisoformat(row['auction_date'])} for row in rows]
+    )
+
+
+async def run(rows: int, url: str):
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    print(f"{'path':<8} {'rows':>8} {'seconds':>10} {'rows/sec':>12}")
+    for request_id, (name, insert) in enumerate((('loop', loop_insert), ('bulk', bulk_insert)), start=1):
+        data = post_rows(rows, request_id)
+        async with session_factory() as session:
+            start = time.perf_counter()
+            await insert(session, data)
+            elapsed = time.perf_counter() - start
+        print(f"{name:<8} {rows:>8} {elapsed:>10.3f} {rows / elapsed:>12.0f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=2000)
+    arg_parser.add_argument("--url", default=None)
+    args = arg_parser.parse_args()
+
+    if args.url:
+        asyncio.run(run(args.rows, args.url))
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            asyncio.run(run(args.rows, f"sqlite+aiosqlite:///{os.path.join(tmp_dir, 'bench.sqlite')}"))
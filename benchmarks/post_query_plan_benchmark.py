@@ -0,0 +1,136 @@
+"""
+Query plans and timings of the post lookups on a seeded table, without and with the lookup indexes.
+
+    python -m benchmarks.post_query_plan_benchmark [--posts 1000000] [--url postgresql+asyncpg://...]
+
+Without ``--url`` a temporary SQLite file is used. The tables are dropped and recreated.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, UTC
+
+from sqlalchemy import Index, MetaData, UniqueConstraint, insert, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from app.database.models import Base
+
+REQUESTS = 50_000
+SEED_CHUNK_SIZE = 20_000
+
+
+def bare_metadata() -> MetaData:
+    """The model tables without their secondary indexes and unique keys."""
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        copy = table.to_metadata(metadata)
+        copy.indexes.clear()
+        for constraint in [c for c in copy.constraints if isinstance(c, UniqueConstraint)]:
+            copy.constraints.discard(constraint)
+    return metadata
+
+
+async def seed(conn: AsyncConnection, metadata: MetaData, posts: int, rng: random.Random):
+    request_filters = metadata.tables['request_filters']
+    post = metadata.tables['post']
+    created_at = datetime.now(UTC)
+
+    await conn.execute(insert(request_filters), [
+        {'id': idx, 'user_uuid': f'user-{idx % 5_000}', 'site': 'COPART', 'make': 'TOYOTA', 'model': 'CAMRY',
+         'created_at': created_at}
+        for idx in range(1, REQUESTS + 1)
+    ])
+    for start in range(0, posts, SEED_CHUNK_SIZE):
+        await conn.execute(insert(post), [
+            {'lot_id': 10_000_000 + idx % (posts // 3 or 1) * 3 + rng.randint(0, 2), 'auction': 'COPART',
+             'title': 'TOYOTA CAMRY', 'odometer': 1, 'year': 2019, 'vin': 'VIN', 'status': 'RUNS',
+             'delivery_price': 1, 'shipping_price': 1, 'is_posted': False, 'images': '',
+             'request_id': idx % REQUESTS + 1, 'created_at': created_at}
+            for idx in range(start, min(start + SEED_CHUNK_SIZE, posts))
+        ])
+
+
+def lookups(posts: int, rng: random.Random) -> dict[str, tuple[str, dict]]:
+    lot_ids = [10_000_000 + rng.randrange(posts) for _ in range(20)]
+    lot_ids_sql = ', '.join(str(lot_id) for lot_id in lot_ids)
+    request_id = rng.randint(1, REQUESTS)
+    return {
+        'get_repeated_posts': (f'SELECT lot_id FROM post WHERE lot_id IN ({lot_ids_sql})', {}),
+        'get_by_lot_id': ('SELECT * FROM post WHERE lot_id = :lot_id LIMIT 1', {'lot_id': lot_ids[0]}),
+        'get_by_request_id': ('SELECT * FROM post WHERE request_id = :request_id', {'request_id': request_id}),
+        'left_only_this_lot_ids': (
+            f'SELECT id FROM post WHERE request_id = :request_id AND lot_id NOT IN ({lot_ids_sql})',
+            {'request_id': request_id}
+        ),
+        'request_filters_by_user': ('SELECT id FROM request_filters WHERE user_uuid = :user_uuid',
+                                    {'user_uuid': 'user-42'}),
+    }
+
+
+async def report(conn: AsyncConnection, queries: dict[str, tuple[str, dict]], repeats: int):
+    explain = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    for name, (sql, params) in queries.items():
+        plan = (await conn.execute(text(explain + sql), params)).all()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            (await conn.execute(text(sql), params)).all()
+        elapsed_ms = (time.perf_counter() - start) / repeats * 1000
+        print(f'  {name:<26} {elapsed_ms:>10.3f} ms')
+        for row in plan:
+            print(f'      {row[-1]}')
+
+
+async def run(posts: int, url: str, repeats: int):
+    rng = random.Random(42)
+    metadata = bare_metadata()
+    engine = create_async_engine(url)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(metadata.create_all)
+        start = time.perf_counter()
+        await seed(conn, metadata, posts, rng)
+        print(f'Seeded {posts} posts in {time.perf_counter() - start:.1f}s')
+
+    queries = lookups(posts, rng)
+    async with engine.connect() as conn:
+        print('Without indexes')
+        await report(conn, queries, repeats)
+
+    async with engine.begin() as conn:
+        start = time.perf_counter()
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                await conn.run_sync(index.create)
+        # Same columns and uniqueness as uq_post_request_id_lot_id
+        await conn.run_sync(Index('uq_post_request_id_lot_id', metadata.tables['post'].c.request_id,
+                                  metadata.tables['post'].c.lot_id, unique=True).create)
+        print(f'Built indexes in {time.perf_counter() - start:.1f}s')
+        if conn.dialect.name == 'postgresql':
+            await conn.execute(text('ANALYZE post'))
+            await conn.execute(text('ANALYZE request_filters'))
+        else:
+            await conn.execute(text('ANALYZE'))
+
+    async with engine.connect() as conn:
+        print('With indexes')
+        await report(conn, queries, repeats)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--posts", type=int, default=1_000_000)
+    arg_parser.add_argument("--repeats", type=int, default=20)
+    arg_parser.add_argument("--url", default=None)
+    args = arg_parser.parse_args()
+
+    if args.url:
+        asyncio.run(run(args.posts, args.url, args.repeats))
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            asyncio.run(run(args.posts, f"sqlite+aiosqlite:///{os.path.join(tmp_dir, 'bench.sqlite')}", args.repeats))
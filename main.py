@@ -2,14 +2,23 @@ import asyncio
 import signal
 from aio_pika import connect_robust
 from app.config import settings
-from app.services.rabbit.rabbit_consumer import RabbitPostsConsumer, PostsRoutingKeys
+from app.core.logger import logger
+from app.core.metrics import metrics
+from app.database.seen_lots import seen_lot_index
+from app.rpc_client.base_client import rpc_channel_pool
+from app.services.ai_post_generation.response_cache import assistant_response_cache
+from app.services.rabbit.outbox_relay import outbox_relay
+from app.services.rabbit.rabbit_consumer import RabbitPostsConsumer, PostsRoutingKeys, posts_consumer_lanes
+from app.services.rabbit.rabbit_service import rabbit_publisher
 
 async def main():
     connection = await connect_robust(settings.RABBITMQ_URL)
-    async with connection:
-        channel = await connection.channel()
-        await channel.set_qos(prefetch_count=2)
-        consumer = RabbitPostsConsumer(connection, [rk.value for rk in PostsRoutingKeys])
+    await rabbit_publisher.connect()
+    metrics_task = asyncio.create_task(metrics.report_periodically(settings.METRICS_LOG_INTERVAL_SECONDS))
+    seen_lots_task = asyncio.create_task(seen_lot_index.run(settings.SEEN_LOTS_REFRESH_SECONDS))
+    outbox_task = asyncio.create_task(outbox_relay.run())
+    consumer = RabbitPostsConsumer(connection, [rk.value for rk in PostsRoutingKeys], lanes=posts_consumer_lanes())
+    try:
         await consumer.set_up()
         await consumer.start_consuming()
         stop_event = asyncio.Event()
@@ -20,6 +29,19 @@ async def main():
             except NotImplementedError:
                 pass
         await stop_event.wait()
+    finally:
+        await consumer.stop_consuming()
+        metrics_task.cancel()
+        seen_lots_task.cancel()
+        # Messages enqueued by the last generations go out before the publisher closes
+        outbox_relay.stop()
+        try:
+            await asyncio.wait_for(outbox_task, timeout=settings.RABBITMQ_SHUTDOWN_GRACE_SECONDS)
+        except TimeoutError:
+            logger.warning("Outbox relay did not drain before shutdown")
+        await rabbit_publisher.close()
+        await rpc_channel_pool.close()
+        await assistant_response_cache.close()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,114 @@
+"""
+Statement counts for the CRUD paths that used to load relationships lazily.
+
+Relationships are ``lazy="raise"``, so every query a path needs is explicit;
+these tests keep the counts flat as the number of posts grows.
+"""
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from app.database.crud.post import PostService
+from app.database.crud.request_filter import RequestFiltersService
+from app.database.enums import AuctionEnum
+from app.database.models import Base, Post, RequestFilters
+
+
+@asynccontextmanager
+async def sqlite_session(tmp_path):
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "queries.sqlite"}')
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)() as session:
+            yield session
+    finally:
+        await engine.dispose()
+
+
+@contextmanager
+def count_statements(session: AsyncSession):
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.bind.sync_engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+async def create_request_with_posts(session: AsyncSession, posts: int) -> RequestFilters:
+    request = RequestFilters(user_uuid='user', site=AuctionEnum.COPART, make='TOYOTA', model='CAMRY')
+    session.add(request)
+    await session.flush()
+    session.add_all(
+        Post(lot_id=40_000_000 + idx, auction=AuctionEnum.COPART, title='2019 TOYOTA CAMRY SE',
+             odometer=10_000 + idx, vin=f'4T1B11HK{idx:09d}', status='RUNS AND DRIVES', year=2019,
+             delivery_price=550, shipping_price=1_250, images='a.JPG,b.JPG', request_id=request.id)
+        for idx in range(posts)
+    )
+    await session.commit()
+    session.expunge_all()
+    return request
+
+
+@pytest.mark.parametrize('posts', [2, 20])
+def test_request_filters_delete_is_bounded(tmp_path, posts):
+    async def scenario():
+        async with sqlite_session(tmp_path) as session:
+            request = await create_request_with_posts(session, posts)
+            with count_statements(session) as statements:
+                assert await RequestFiltersService(session).delete(request.id)
+            return statements
+
+    statements = asyncio.run(scenario())
+    # Filters row, its posts in one selectin query, one executemany DELETE of the posts, the filters row
+    assert len(statements) == 4, statements
+
+
+def test_post_get_loads_no_relationships(tmp_path):
+    async def scenario():
+        async with sqlite_session(tmp_path) as session:
+            request = await create_request_with_posts(session, 3)
+            post_id = (await PostService(session).get_by_request_id(request.id))[0].id
+            session.expunge_all()
+
+            with count_statements(session) as statements:
+                post = await PostService(session).get(post_id)
+            with pytest.raises(InvalidRequestError):
+                _ = post.request
+            session.expunge_all()
+
+            with count_statements(session) as with_request:
+                post = await PostService(session).get(post_id, options=[selectinload(Post.request)])
+            assert post.request.id == request.id
+            return statements, with_request
+
+    statements, with_request = asyncio.run(scenario())
+    assert len(statements) == 1, statements
+    assert len(with_request) == 2, with_request
+
+
+@pytest.mark.parametrize('posts', [3, 30])
+def test_left_only_this_lot_ids_is_bounded(tmp_path, posts):
+    async def scenario():
+        async with sqlite_session(tmp_path) as session:
+            request = await create_request_with_posts(session, posts)
+            keep = [40_000_000, 40_000_001]
+            with count_statements(session) as statements:
+                left = await PostService(session).left_only_this_lot_ids(request.id, keep)
+            assert sorted(post.lot_id for post in left) == keep
+            return statements
+
+    statements = asyncio.run(scenario())
+    # One set-based DELETE and one SELECT of what is left, whatever the number of posts
+    assert len(statements) == 2, statements